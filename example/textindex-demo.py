@@ -27,69 +27,91 @@ from pathlib import Path
 
 from textindex import textindex
 
-# -----------------------------
-# Parse command-line arguments
-# -----------------------------
-parser = argparse.ArgumentParser(allow_abbrev=False)
-parser.add_argument(
-    "--verbose",
-    "-v",
-    help="[optional] Enable verbose logging",
-    action="store_true",
-    default=False,
-)
-parser.add_argument(
-    "input_file",
-    nargs="?",
-    default="example.md",
-    help="[optional] Markdown file to process",
-)
-args = parser.parse_args()
-
-verbose = args.verbose
-
-# -----------------------------
-# Determine paths relative to this script
-# -----------------------------
-script_path = Path(__file__).resolve()
-script_dir = script_path.parent
-
-# Input Markdown file
-file_path = script_dir / args.input_file
-
-# Concordance / TOML configuration file
-conc_path = script_dir / "textindex-config.toml"
-
-# Output filename derived from input
-output_filename = script_dir / f"{file_path.stem}-converted{file_path.suffix}"
-
-# -----------------------------
-# Check files exist
-# -----------------------------
-if not file_path.is_file():
-    print(f"Error: Input file not found: {file_path}")
-    sys.exit(1)
-
-if not conc_path.is_file():
-    print(f"Error: TOML configuration not found: {conc_path}")
-    sys.exit(1)
-
-# -----------------------------
-# Process the document
-# -----------------------------
-try:
-    file_contents = file_path.read_text(encoding="utf-8")
-
-    index = textindex.TextIndex(file_contents)
-    index.verbose = verbose
-    index.convert_latex_index_commands()
-    index.load_concordance_file(str(conc_path))
-    file_contents = index.indexed_document()
-
-    output_filename.write_text(file_contents, encoding="utf-8")
-
-    print(f"Wrote output file: {output_filename}")
-
-except IOError as e:
-    print(f"Error: {e}")
-    sys.exit(1)
+# Resolved once; every other path is joined onto it.
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+
+def main() -> int:
+    """Convert the example document and write it next to this script.
+
+    Returns:
+        Process exit status.
+    """
+    # -----------------------------
+    # Parse command-line arguments
+    # -----------------------------
+    parser = argparse.ArgumentParser(allow_abbrev=False)
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        help="[optional] Enable verbose logging",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "input_file",
+        nargs="?",
+        default="example.md",
+        help="[optional] Markdown file to process",
+    )
+    args = parser.parse_args()
+
+    # -----------------------------
+    # Determine paths relative to this script
+    # -----------------------------
+    # Input Markdown file
+    file_path = SCRIPT_DIR / args.input_file
+
+    # Concordance / TOML configuration file
+    conc_path = SCRIPT_DIR / "textindex-config.toml"
+
+    # Output filename derived from input
+    output_filename = (
+        SCRIPT_DIR / f"{file_path.stem}-converted{file_path.suffix}"
+    )
+
+    # -----------------------------
+    # Check files exist
+    # -----------------------------
+    if not file_path.is_file():
+        print(f"Error: Input file not found: {file_path}")
+        return 1
+
+    if not conc_path.is_file():
+        print(f"Error: TOML configuration not found: {conc_path}")
+        return 1
+
+    # -----------------------------
+    # Process the document
+    # -----------------------------
+    try:
+        file_contents = file_path.read_text(encoding="utf-8")
+
+        index = textindex.TextIndex(file_contents)
+        index.verbose = args.verbose
+        index.convert_latex_index_commands()
+        index.load_concordance_file(conc_path)
+
+        # Stream the indexed document through a large buffer into a
+        # temporary file, then swap it in so readers never see a partial
+        # output file.
+        temp_filename = output_filename.with_name(output_filename.name + ".tmp")
+        try:
+            with open(
+                temp_filename, "w", buffering=1 << 20, encoding="utf-8"
+            ) as output_file:
+                index.write_indexed_document(output_file)
+            temp_filename.replace(output_filename)
+        finally:
+            temp_filename.unlink(missing_ok=True)
+
+        print(f"Wrote output file: {output_filename}")
+
+    except IOError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
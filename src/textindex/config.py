@@ -21,14 +21,21 @@
 
 from __future__ import annotations
 
-import csv
-import tomllib
-from dataclasses import dataclass, field
+import functools
+import re
+import sys
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Iterable, Literal, Optional, Type
 
+# Index marks already present in a document, together with any bracketed or
+# bare visible text they apply to. Concordance matching never rewrites these.
+_EXISTING_MARK_PATTERN = r"(?:\[[^\]\n<>]+\]|[^\s\[\]\{\}<>]+)?\{\^[^}\n<]*\}"
+_REGEX_METACHARACTERS = frozenset("\\.^$*+?{}[]|()")
+_OCTAL_DIGITS = frozenset("01234567")
 
-@dataclass(slots=True)
+
+@dataclass(slots=True, frozen=True)
 class ConcordanceRule:
     """Represents a single pattern→replacement rule in a concordance.
 
@@ -40,18 +47,269 @@ class ConcordanceRule:
             Text or markup to insert for matches. May include index mark syntax.
         comment : Optional[str]
             Optional explanation or inline documentation.
+
+    The pattern is compiled once at construction, so an invalid expression
+    raises ``re.error`` when the configuration is loaded rather than when a
+    document is processed.
     """
 
     pattern: str
     replacement: Optional[str] = None
     comment: Optional[str] = None
+    _compiled: re.Pattern = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
+        # Rule sets repeat many short terms; share one string per term.
+        object.__setattr__(self, "pattern", sys.intern(self.pattern))
         # Normalize empty strings to None for consistency.
         if self.replacement == "":
-            self.replacement = None
+            object.__setattr__(self, "replacement", None)
         if self.comment == "":
-            self.comment = None
+            object.__setattr__(self, "comment", None)
+        object.__setattr__(self, "_compiled", _compile(self.expression))
+
+    @property
+    def case_sensitive(self) -> bool:
+        """True if the pattern is `=` prefixed or contains uppercase letters."""
+        pattern = self.pattern
+        return pattern.startswith("=") or pattern != pattern.lower()
+
+    @property
+    def expression(self) -> str:
+        """Return the regex source with the rule's case sensitivity applied."""
+        body = self.pattern.removeprefix("=")
+        return f"(?:{body})" if self.case_sensitive else f"(?i:{body})"
+
+    @property
+    def is_literal(self) -> bool:
+        """True if the pattern contains no regex metacharacters."""
+        return _REGEX_METACHARACTERS.isdisjoint(self.pattern)
+
+
+class Concordance:
+    """Applies concordance rules to document text in a single regex pass.
+
+    Every rule becomes one named alternative (``r0`` … ``rN``) of a single
+    compiled pattern, so the document is scanned once no matter how many rules
+    there are. Each rule's own groups are renamed into an ``rI_`` namespace,
+    so backreferences keep pointing at the rule's groups rather than at
+    whatever number they end up with in the combined pattern. Where rules
+    overlap the leftmost match wins, and at the same
+    position the earlier rule wins. Existing index marks are matched first and
+    passed through unchanged so text is never marked twice.
+
+    Literal rules (no regex metacharacters) are merged into a prefix trie per
+    case sensitivity, an Aho–Corasick style automaton that the regex engine
+    walks once per position instead of trying every literal in turn. Among
+    themselves, literals therefore match leftmost-longest.
+
+    Examples:
+        >>> rules = [ConcordanceRule("layers?", "toggle>layer")]
+        >>> Concordance(rules).apply("Two layers{^} and a layer.")
+        'Two layers{^} and a [layer]{^toggle>layer}.'
+    """
+
+    def __init__(self, rules: Iterable[ConcordanceRule]):
+        """Compile the rules into a single alternation pattern.
+
+        Args:
+            rules (Iterable[ConcordanceRule]): rules in priority order.
+        """
+        self.rules = [rule for rule in rules if rule.pattern.removeprefix("=")]
+        self._replacements = [rule.replacement or "" for rule in self.rules]
+        # Literal text (lowercased unless case-sensitive) -> rule index.
+        self._literals: dict[bool, dict[str, int]] = {False: {}, True: {}}
+        self._pattern: re.Pattern | None = None
+        if not self.rules:
+            return
+
+        alternatives = [f"(?P<mark>{_EXISTING_MARK_PATTERN})"]
+        for i, rule in enumerate(self.rules):
+            if not rule.is_literal:
+                expression = _isolate_groups(rule.expression, f"r{i}_")
+                alternatives.append(f"(?P<r{i}>{expression})")
+                continue
+            sensitive = rule.case_sensitive
+            words = self._literals[sensitive]
+            if not words:
+                # The trie takes the priority slot of its first literal.
+                alternatives.append("litcs" if sensitive else "lit")
+            word = rule.pattern.removeprefix("=")
+            words.setdefault(word if sensitive else word.lower(), i)
+        for sensitive, group in ((False, "lit"), (True, "litcs")):
+            if self._literals[sensitive]:
+                trie = _trie_expression(self._literals[sensitive])
+                if not sensitive:
+                    trie = f"(?i:{trie})"
+                slot = alternatives.index(group)
+                alternatives[slot] = f"(?P<{group}>{trie})"
+        self._pattern = re.compile("|".join(alternatives))
+
+    def apply(self, text: str) -> str:
+        """Return text with every rule match wrapped in an index mark."""
+        parts: list[str] = []
+        pos = 0
+        for index, start, end in self.scan(text):
+            parts.append(text[pos:start])
+            parts.append(f"[{text[start:end]}]{{^{self._replacements[index]}}}")
+            pos = end
+        if not parts:
+            return text
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    def scan(self, text: str) -> list[tuple[int, int, int]]:
+        """Find rule matches outside existing index marks.
+
+        Args:
+            text (str): document text to scan.
+
+        Returns:
+            list[tuple[int, int, int]]: ``(rule index, start, end)`` for each
+            non-empty match, in document order and never overlapping.
+        """
+        if self._pattern is None:
+            return []
+        spans = []
+        append = spans.append
+        # The rule index is recovered from the matched group, so the whole
+        # rule set still costs one scan of the document.
+        insensitive, sensitive = self._literals[False], self._literals[True]
+        for m in self._pattern.finditer(text):
+            group = m.lastgroup
+            start, end = m.span()
+            if group == "mark" or end == start:
+                continue
+            if group == "lit":
+                index = insensitive[m.group().lower()]
+            elif group == "litcs":
+                index = sensitive[m.group()]
+            else:
+                index = int(group[1:])
+            append((index, start, end))
+        return spans
+
+
+@functools.lru_cache(maxsize=8)
+def _build_concordance(rules: tuple[ConcordanceRule, ...]) -> Concordance:
+    """Compile a rule set once; rules are frozen, so equal sets can share."""
+    return Concordance(rules)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile(expression: str) -> re.Pattern:
+    """Compile a rule expression, sharing the result between duplicates.
+
+    The cache is bounded so a long-lived process that loads many different
+    rule sets does not keep every pattern it has ever seen.
+    """
+    return re.compile(expression)
+
+
+def _isolate_groups(expression: str, prefix: str) -> str:
+    r"""Rename every capturing group in expression into the prefix namespace.
+
+    Numbered groups become ``<prefix><n>`` and named groups
+    ``<prefix><name>``; backreferences (``\1``, ``(?P=name)``) and
+    conditionals (``(?(1)…)``) are rewritten to match, so the expression can
+    be embedded in a larger pattern without its references shifting.
+
+    Examples:
+        >>> _isolate_groups(r"(a|b)\1", "r0_")
+        '(?P<r0_1>a|b)(?P=r0_1)'
+    """
+    out: list[str] = []
+    append = out.append
+    groups = 0
+    i, n = 0, len(expression)
+    while i < n:
+        char = expression[i]
+        if char == "\\":
+            digits = expression[i + 1 : i + 4]
+            if digits[:1].isdigit() and digits[0] != "0":
+                if len(digits) == 3 and _OCTAL_DIGITS.issuperset(digits):
+                    # Three octal digits are a character, not a reference.
+                    append(expression[i : i + 4])
+                    i += 4
+                    continue
+                number = digits[:2] if digits[1:2].isdigit() else digits[0]
+                append(f"(?P={prefix}{int(number)})")
+                i += 1 + len(number)
+                continue
+            append(expression[i : i + 2])
+            i += 2
+        elif char == "[":
+            # Character classes hold no groups or references; copy verbatim.
+            end = i + 1
+            if expression[end : end + 1] == "^":
+                end += 1
+            if expression[end : end + 1] == "]":
+                end += 1
+            while end < n and expression[end] != "]":
+                end += 2 if expression[end] == "\\" else 1
+            append(expression[i : end + 1])
+            i = end + 1
+        elif char != "(":
+            append(char)
+            i += 1
+        elif expression.startswith("(?P<", i):
+            groups += 1
+            append(f"(?P<{prefix}")
+            i += 4
+        elif expression.startswith("(?P=", i):
+            append(f"(?P={prefix}")
+            i += 4
+        elif expression.startswith("(?(", i):
+            end = expression.index(")", i)
+            name = expression[i + 3 : end]
+            append(f"(?({prefix}{int(name) if name.isdigit() else name})")
+            i = end + 1
+        elif expression.startswith("(?", i):
+            append("(?")
+            i += 2
+        else:
+            groups += 1
+            append(f"(?P<{prefix}{groups}>")
+            i += 1
+    return "".join(out)
+
+
+def _trie_expression(words: Iterable[str]) -> str:
+    """Build a prefix-factored regex matching any of the words, longest first.
+
+    Examples:
+        >>> _trie_expression(["tap", "taps", "top"])
+        't(?:ap(?:s)?|op)'
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _trie_node_expression(trie)
+
+
+def _trie_node_expression(node: dict) -> str:
+    branches = []
+    for char, child in sorted(node.items()):
+        if not char:
+            continue
+        # Collapse single-child chains into one literal run.
+        run = [char]
+        while len(child) == 1 and "" not in child:
+            ((char, child),) = child.items()
+            run.append(char)
+        branches.append(re.escape("".join(run)) + _trie_node_expression(child))
+    if not branches:
+        return ""
+    expression = (
+        branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+    )
+    if "" in node:
+        # Greedy optional tail keeps the longest literal.
+        return f"(?:{expression})?"
+    return expression
 
 
 @dataclass(slots=True)
@@ -110,6 +368,13 @@ class ProjectConfig:
         concordance_rules = _parse_concordance_from_tsv_rows(rows)
         return cls(rendering, concordance_rules)
 
+    def concordance(self) -> Concordance:
+        """Return a Concordance applying this configuration's rules.
+
+        Configurations with the same rules share one compiled Concordance.
+        """
+        return _build_concordance(tuple(self.concordance_rules))
+
 
 def load_project_config(base_path: str | Path) -> ProjectConfig:
     """Load TextIndex configuration.
@@ -118,6 +383,10 @@ def load_project_config(base_path: str | Path) -> ProjectConfig:
       1. textindex-config.toml (preferred modern format)
       2. example-concordance.tsv (legacy fallback)
 
+    Results are cached per resolved directory and invalidated whenever
+    either file's modification time or size changes. Each call returns its
+    own copy, so callers may adjust the rendering options freely.
+
     Args:
         base_path(str | Path): Directory containing configuration files.
 
@@ -126,18 +395,62 @@ def load_project_config(base_path: str | Path) -> ProjectConfig:
     """
     if isinstance(base_path, str):
         base_path = Path(base_path.strip())
+    # Resolve first so every spelling of a directory shares one cache entry.
+    base_path = base_path.resolve()
     toml_path = base_path / "example" / "textindex-config.toml"
     tsv_path = base_path / "example" / "example-concordance.tsv"
+    toml_stamp, tsv_stamp = _file_stamp(toml_path), _file_stamp(tsv_path)
 
-    # --- Prefer TOML ---
-    if toml_path.is_file():
+    # Report which source is used on every call, cached or not.
+    if toml_stamp is not None:
         print(f"[TextIndex] Using configuration from '{toml_path.name}'.")
-        if tsv_path.is_file():
+        if tsv_stamp is not None:
             mess = (
                 "[TextIndex] Ignoring legacy concordance at"
                 f" {tsv_path.name} (TOML override found)."
             )
             print(mess)
+    elif tsv_stamp is not None:
+        mess = (
+            "[TextIndex] No TOML config found."
+            f" Loading legacy concordance from {tsv_path.name}."
+        )
+        print(mess)
+    else:
+        mess = (
+            "[TextIndex] Info: No configuration file found in "
+            f"'{base_path}'. Using defaults."
+        )
+        print(mess)
+
+    cached = _load_project_config_cached(base_path, toml_stamp, tsv_stamp)
+    # Rules are frozen and can be shared; the rendering options are not.
+    return ProjectConfig(
+        replace(cached.rendering), list(cached.concordance_rules)
+    )
+
+
+def _file_stamp(path: Path) -> tuple[int, int] | None:
+    """Return (mtime_ns, size) for a regular file, or None if there is none."""
+    if not path.is_file():
+        return None
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+@functools.lru_cache(maxsize=8)
+def _load_project_config_cached(
+    base_path: Path,
+    toml_stamp: tuple[int, int] | None,
+    tsv_stamp: tuple[int, int] | None,
+) -> ProjectConfig:
+    """Parse the configuration files; the stamps only key the cache."""
+    toml_path = base_path / "example" / "textindex-config.toml"
+    tsv_path = base_path / "example" / "example-concordance.tsv"
+
+    # --- Prefer TOML ---
+    if toml_stamp is not None:
+        import tomllib  # deferred: only needed when a TOML file exists
 
         with toml_path.open("rb") as f:
             data = tomllib.load(f)
@@ -145,25 +458,14 @@ def load_project_config(base_path: str | Path) -> ProjectConfig:
         return ProjectConfig.from_toml(data)
 
     # --- Fallback to legacy TSV ---
-    if tsv_path.is_file():
-        mess = (
-            "[TextIndex] No TOML config found."
-            f" Loading legacy concordance from {tsv_path.name}."
-        )
-        print(mess)
-
+    if tsv_stamp is not None:
+        # Plain tab splitting: quotes belong to the index mark syntax.
         with tsv_path.open("r", encoding="utf-8") as f:
-            reader = csv.reader(f, delimiter="\t")
-            rows = list(reader)
+            rows = [line.split("\t") for line in f.read().splitlines()]
 
         return ProjectConfig.from_tsv(rows)
 
     # --- Nothing found ---
-    mess = (
-        "[TextIndex] Info: No configuration file found in "
-        f"'{base_path.resolve()}'. Using defaults."
-    )
-    print(mess)
     return ProjectConfig()
 
 
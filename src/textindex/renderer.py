@@ -21,11 +21,61 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import re
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import TYPE_CHECKING, Callable
 
 if TYPE_CHECKING:
     from .textindex import TextIndex, TextIndexEntry
 
+_ESCAPE_MAP = {"&": "&amp;", "<": "&lt;", ">": "&gt;"}
+# Labels are only written as element content, where a raw " is valid, so
+# quotes are not escaped.
+_ESCAPE_RE = re.compile(r"[&<>]")
+
+# Fixed fragments around entry rows and nested entries; shared, not rebuilt
+# per node.
+_ROW_OPEN = "\t<dt>"
+_ROW_CLOSE = "</dt>\n"
+_CHILDREN_OPEN = "\t<dd>\n\t\t<dl>\n"
+_CHILD_INDENT = "\t\t\t"
+_CHILDREN_CLOSE = "\t\t</dl>\n\t</dd>\n"
+_REFS_OPEN = '<span class="entry-references">'
+_REFS_CLOSE = "</span>"
+
+
+@dataclass(slots=True)
+class _FlatTree:
+    """An entry tree laid out in flat parallel lists.
+
+    Attributes:
+        nodes : list[TextIndexEntry]
+            Entries level by level; the ``root_count`` roots come first.
+        child_count : list[int]
+            Number of children of each node.
+        child_offset : list[int]
+            Index in ``nodes`` of each node's first child.
+        root_count : int
+            Number of top-level entries.
+        tokens : list[int]
+            Depth-first open/close sequence: ``i`` opens node ``i`` and
+            ``~i`` closes it. Leaves have no close token.
+        match : list[int]
+            For each token, the position of its partner; a leaf's open
+            token matches itself.
+        headings : list[str]
+            Heading ``<span>`` of each node: anchor id and escaped label.
+    """
+
+    nodes: list[TextIndexEntry]
+    child_count: list[int]
+    child_offset: list[int]
+    root_count: int
+    tokens: list[int] = field(default_factory=list)
+    match: list[int] = field(default_factory=list)
+    headings: list[str] = field(default_factory=list)
+
 
 class HTMLIndexRenderer:
     """Render TextIndex entries into an HTML <dl> hierarchy."""
@@ -33,86 +83,288 @@ class HTMLIndexRenderer:
     def __init__(self, textindex: "TextIndex"):
         self.textindex = textindex
         self.config = textindex.config
+        # Label prefixes are fixed for the whole render; build them once.
+        see_cap = self.config.see_label.capitalize()
+        see_also_cap = self.config.see_also_label.capitalize()
+        self._see_prefix = f"<em>{see_cap}</em> "
+        self._see_also_prefix = f"<em>{see_also_cap}</em> "
+        # Cross-reference type keys, looked up once rather than per entry.
+        self._see_type = textindex._prefix
+        self._also_type = textindex._also
 
     def render(self) -> str:
         """Render the full index as <dl class="textindex index">…</dl>."""
-        entries = self.textindex.sort_entries(self.textindex.entries)
-        html = '<dl class="textindex index">\n'
-        prev_initial = None
-        is_first = True
-        for ent in entries:
-            initial = (ent.sort_on()[:1] or "").upper()
+        # One buffer for the whole index, joined once at the end. It is not
+        # pooled on the instance: list.clear() releases the backing array,
+        # so a reused list would keep no capacity between renders.
+        parts: list[str] = []
+        self._write_index(parts.append)
+        return "".join(parts)
+
+    def write_to(self, write: Callable[[str], object]) -> None:
+        """Pass the rendered index to ``write`` one initial group at a time.
+
+        The chunks joined give exactly the output of render(); handing them
+        on one by one avoids holding the whole index in memory at once.
+
+        Args:
+            write (Callable[[str], object]): Sink for the chunks, e.g. a
+                stream's write method.
+        """
+        parts: list[str] = []
+
+        def flush() -> None:
+            write("".join(parts))
+            parts.clear()
+
+        self._write_index(parts.append, flush)
+        flush()
+
+    def _write_index(
+        self,
+        write: Callable[[str], object],
+        flush: Callable[[], object] | None = None,
+    ) -> None:
+        """Write the index through ``write``.
+
+        Args:
+            write (Callable[[str], object]): Sink for output fragments.
+            flush (Callable[[], object] | None): Called after each
+                initial-letter group, so callers can pass on what has been
+                written so far.
+        """
+        roots = list(self.textindex.sort_entries_iter(self.textindex.entries))
+        flat = self._flatten(roots)
+        group_heading = self.textindex.group_heading
+        write('<dl class="textindex index">\n')
+        position_in_tokens = 0
+        # Top-level entries are rendered serially. Each one is a separate
+        # token slice, but the work is pure Python holding the GIL, and
+        # rendering cross-references reports missing targets in order.
+        groups = groupby(roots, key=_initial_key)
+        for position, (initial, group) in enumerate(groups):
             # Group separators (blank line entries) between groups
-            if prev_initial is not None and initial != prev_initial:
-                html += self.textindex.group_heading(initial)
-            elif is_first:
-                html += self.textindex.group_heading(initial, is_first=True)
-            is_first = False
-            prev_initial = initial
-
-            html += self._render_entry(ent)
-        html += "</dl>\n"
-        return html
-
-    def _render_entry(self, entry: "TextIndexEntry") -> str:
-        html = "\t<dt>"
-        html += f'<span id="{entry._entry_id_prefix}{entry.entry_id}" class="entry-heading">{self._escape(entry.label)}</span>'
+            if position == 0:
+                write(group_heading(initial, is_first=True))
+            else:
+                write(group_heading(initial))
+            for _ in group:
+                position_in_tokens = self._render_tokens(
+                    position_in_tokens, flat, write
+                )
+            if flush is not None:
+                flush()
+        write("</dl>\n")
+
+    def render_entry(self, entry: "TextIndexEntry") -> str:
+        """Render a single entry and its sub-entries as <dt>/<dd> rows."""
+        parts: list[str] = []
+        self._render_tokens(0, self._flatten([entry]), parts.append)
+        return "".join(parts)
+
+    def _flatten(self, roots: list["TextIndexEntry"]) -> _FlatTree:
+        """Lay the entry tree out level by level in parallel lists.
+
+        The roots come first, and the sorted children of node ``i`` are
+        ``nodes[child_offset[i]:child_offset[i] + child_count[i]]``. The
+        depth-first token sequence used for rendering is built as well.
+
+        Args:
+            roots (list[TextIndexEntry]): Already sorted top-level entries.
+
+        Returns:
+            _FlatTree: The flattened tree.
+        """
+        nodes = list(roots)
+        child_count: list[int] = []
+        child_offset: list[int] = []
+        sort_entries = self.textindex.sort_entries_iter
+        # Children are appended while iterating, so each level follows the
+        # one before it. Level order is kept (rather than a depth-first or
+        # van Emde Boas order) because the lists hold references to entries
+        # allocated elsewhere; reordering them would not move the entries
+        # closer together, and the token sequence already fixes the walk.
+        for node in nodes:
+            offset = len(nodes)
+            child_offset.append(offset)
+            nodes.extend(sort_entries(node.entries))
+            child_count.append(len(nodes) - offset)
+        flat = _FlatTree(nodes, child_count, child_offset, len(roots))
+        _tokenize(flat)
+        # Row headings are built in one pass here, so the render walk reads
+        # them from a list instead of formatting from each entry.
+        labels = _escape_batch([node.label for node in nodes])
+        flat.headings = [
+            f'<span id="{node._entry_id_prefix}{node.entry_id}" '
+            f'class="entry-heading">{label}</span>'
+            for node, label in zip(nodes, labels)
+        ]
+        return flat
+
+    def _render_tokens(
+        self, start: int, flat: _FlatTree, write: Callable[[str], object]
+    ) -> int:
+        """Render the sub-tree whose open token is at ``start``.
+
+        Returns:
+            int: Position of the token following the sub-tree.
+        """
+        nodes = flat.nodes
+        headings = flat.headings
+        child_count = flat.child_count
+        root_count = flat.root_count
+        render_row = self._render_row
+        stop = flat.match[start] + 1
+        # A straight walk over the token slice; no stack is needed because
+        # the open/close order is already fixed.
+        for token in flat.tokens[start:stop]:
+            if token < 0:
+                write(_CHILDREN_CLOSE)
+            elif token < root_count:
+                render_row(
+                    nodes[token], headings[token], child_count[token], write
+                )
+            else:
+                write(_CHILD_INDENT)
+                render_row(
+                    nodes[token], headings[token], child_count[token], write
+                )
+        return stop
+
+    def _render_row(
+        self,
+        entry: "TextIndexEntry",
+        heading: str,
+        child_count: int,
+        write: Callable[[str], object],
+    ) -> None:
+        """Write an entry's <dt> row and, if it has children, open its <dd>.
+
+        Args:
+            entry (TextIndexEntry): The entry to render.
+            heading (str): The entry's heading span, label already escaped.
+            child_count (int): Number of sub-entries of the entry.
+            write (Callable[[str], object]): Sink for output fragments.
+        """
+        write(_ROW_OPEN)
+        write(heading)
         # References (locators)
-        refs_html = self._render_references(entry)
-        xref_see = entry._render_xrefs_of_type(self.textindex._prefix)
-        xref_also = entry._render_xrefs_of_type(self.textindex._also)
+        # Bare entries skip the locator and cross-reference rendering.
+        refs = entry._sorted_references() if entry.has_references() else None
         xref_bits = []
+        if entry.has_cross_references():
+            xref_see = entry._render_xrefs_of_type(self._see_type)
+            xref_also = entry._render_xrefs_of_type(self._also_type)
+        else:
+            xref_see = xref_also = None
         if xref_see:
-            xref_bits.append(
-                f"<em>{self.config.see_label.capitalize()}</em> {xref_see}"
-            )
+            xref_bits.append(self._see_prefix + xref_see)
         if xref_also:
-            xref_bits.append(
-                f"<em>{self.config.see_also_label.capitalize()}</em> {xref_also}"
-            )
-        # Render refs/xrefs: if entry has children, put xrefs as separate child DT
-        if refs_html:
-            html += f'<span class="entry-references">, {refs_html}'
+            xref_bits.append(self._see_also_prefix + xref_also)
+        # Render refs/xrefs: if entry has children, put xrefs as a separate
+        # child DT
+        if refs:
+            write(_REFS_OPEN)
+            self._write_references(entry, refs, write)
             # If we add xrefs here (no children), punctuation handled below
-            if not entry.entries and xref_bits:
-                html += f". {'. '.join(xref_bits)}"
-            html += "</span>"
-        else:
-            if not entry.entries and xref_bits:
-                html += f'<span class="entry-references">. {". ".join(xref_bits)}</span>'
-        html += "</dt>\n"
+            if not child_count and xref_bits:
+                write(". ")
+                write(". ".join(xref_bits))
+            write(_REFS_CLOSE)
+        elif not child_count and xref_bits:
+            write(_REFS_OPEN)
+            write(". ")
+            write(". ".join(xref_bits))
+            write(_REFS_CLOSE)
+        write(_ROW_CLOSE)
 
         # Children
-        if entry.entries:
-            html += "\t<dd>\n\t\t<dl>\n"
+        if child_count:
+            write(_CHILDREN_OPEN)
             # If there are xrefs, render them as a separate child row first
             if xref_bits:
-                html += (
+                write(
                     '\t\t\t<dt><span class="entry-references">'
                     + " . ".join(xref_bits)
                     + "</span></dt>\n"
                 )
-            for child in self.textindex.sort_entries(entry.entries):
-                html += "\t\t\t" + self._render_entry(child)
-            html += "\t\t</dl>\n\t</dd>\n"
 
-        return html
+    @staticmethod
+    def _write_references(
+        entry: "TextIndexEntry",
+        refs: list,
+        write: Callable[[str], object],
+    ) -> None:
+        """Write each locator of ``refs``, preceded by its ", " separator.
 
-    def _render_references(self, entry: "TextIndexEntry") -> str | None:
-        refs = entry._sorted_references()
-        if not refs:
-            return None
-        parts = [entry._build_locator_html(ref) for ref in refs]
-        return ", ".join(parts)
+        Locators go straight to the render buffer rather than being joined
+        into an intermediate string first.
+        """
+        build = entry._build_locator_html
+        for ref in refs:
+            write(", ")
+            write(build(ref))
 
     @staticmethod
     def _escape(text: str) -> str:
-        if text is None:
+        if text is None or text == "":
             return ""
-        return (
-            str(text)
-            .replace("&", "&amp;")
-            .replace("<", "&lt;")
-            .replace(">", "&gt;")
-            .replace('"', "&quot;")
-        )
+        return _escape_html(str(text))
+
+
+def _initial_key(entry: "TextIndexEntry") -> str:
+    """Return the uppercase initial an entry is grouped under."""
+    return (entry.sort_on()[:1] or "").upper()
+
+
+def _escape_html(text: str) -> str:
+    """HTML-escape text; callers must pass a str, never None.
+
+    Most labels contain nothing to escape and are returned as they are.
+    """
+    return _ESCAPE_RE.sub(_escape_match, text)
+
+
+def _escape_batch(labels: list[str | None]) -> list[str]:
+    """HTML-escape many labels with a single regex pass.
+
+    The labels are joined on NUL, escaped together and split again. Labels
+    that themselves contain NUL fall back to escaping one at a time.
+    """
+    joined = "\0".join([label or "" for label in labels])
+    if joined.count("\0") != len(labels) - 1:
+        return [HTMLIndexRenderer._escape(label) for label in labels]
+    return _ESCAPE_RE.sub(_escape_match, joined).split("\0")
+
+
+def _escape_match(match: re.Match) -> str:
+    return _ESCAPE_MAP[match.group()]
+
+
+def _tokenize(flat: _FlatTree) -> None:
+    """Fill in the depth-first open/close tokens of a flattened tree.
+
+    A pending close is pushed as ``~position`` of its open token, so the
+    two can be linked in ``match`` when it is popped.
+    """
+    tokens = flat.tokens
+    match = flat.match
+    child_count = flat.child_count
+    child_offset = flat.child_offset
+    stack = list(reversed(range(flat.root_count)))
+    while stack:
+        item = stack.pop()
+        position = len(tokens)
+        if item < 0:
+            opened = ~item
+            tokens.append(~tokens[opened])
+            match.append(opened)
+            match[opened] = position
+            continue
+        tokens.append(item)
+        match.append(position)
+        count = child_count[item]
+        if count:
+            stack.append(~position)
+            start = child_offset[item]
+            stack.extend(reversed(range(start, start + count)))
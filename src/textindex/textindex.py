@@ -41,25 +41,93 @@ Usage:
 
 from __future__ import annotations
 
+import functools
 import re
-import tomllib
-from dataclasses import dataclass, field, fields
-from operator import methodcaller
+import sys
+from dataclasses import dataclass, field
+from itertools import count
+from operator import attrgetter, methodcaller
 from pathlib import Path
 from typing import (
     Any,
+    Callable,
+    ClassVar,
     Dict,
+    Iterator,
     List,
     Optional,
     Self,
+    Set,
+    TextIO,
     Tuple,
     get_args,
     get_origin,
+    get_type_hints,
 )
 
-from textindex.config import IndexConfig
+from textindex.config import Concordance, IndexConfig, ProjectConfig
 from textindex.renderer import HTMLIndexRenderer
 
+# Patterns compiled once at import rather than looked up per call.
+_EMPHASIS_RE = re.compile(r"_([^_]+?)_")
+_SLUG_QUOTES = str.maketrans("", "", "'\"“”‘’")
+_SLUG_NON_WORD_RE = re.compile(r"\W+")
+_INTERNAL_SUFFIX_RE = re.compile(r"\[([^\]]+)\]")
+# Mark body directives: sort key ~"...", alias definition ##name and alias
+# reference #name, matched together in one left-to-right scan.
+_MARK_DIRECTIVE_RE = re.compile(
+    r"~\"(?P<sort_key>[^\"]+)\""
+    r"|##(?P<alias_def>[A-Za-z0-9\-_]+)"
+    r"|#(?P<alias_ref>[A-Za-z0-9\-_]+)"
+)
+_XREF_QUOTED_SORT_KEY_RE = re.compile(r"~\"[^\"]*\"")
+_XREF_SORT_KEY_RE = re.compile(r"~[\w\-]+")
+# Characters that introduce flags, directives or cross-references in a mark.
+_MARK_SYNTAX_CHARS = frozenset("~#|/!")
+# Opening quote -> closing quote accepted around path segments.
+_QUOTE_PAIRS = {'"': '"', "“": "”"}
+_WILDCARD_RE = re.compile(r"\*\^(\-?)")
+_HEADING_ATTRIBUTE_RE = re.compile(
+    r'([.#][\w:-]+|[\w:-]+=(?:"[^"]*"|\'[^\']*\'|[^\s]*)|[\w\-.]+)'
+)
+# Entry lists carried over when one entry is merged into another.
+_MERGED_ENTRY_LISTS = ("references", "cross_references", "entries")
+# All directive syntaxes in one alternation, so the text is scanned once;
+# exactly one named group takes part in each match.
+_INDEX_DIRECTIVE_RE = re.compile(
+    r"{\^index:(?P<md>[^}]+)}"  # Markdown-style (modern)
+    r"|{\^(?P<legacy>[^}:]+)}"  # Legacy shorthand {^term}
+    r"|@index\{(?P<rst>[^}]+)\}"  # reST-style
+    r"|\\index\{(?P<tex>[^}]+)\}"  # LaTeX-style
+)
+
+
+def _parse_bool(value: str) -> bool:
+    """Interpret a configuration string as a boolean."""
+    return value.lower() in {"true", "1", "yes", "on"}
+
+
+def _cast_for_type(field_type: Any) -> Callable[[str], Any]:
+    """Return the function converting a configuration string to a type."""
+    # Handle Optional[...] annotations
+    args = get_args(field_type)
+    if get_origin(field_type) is not None and type(None) in args:
+        field_type = next(a for a in args if a is not type(None))
+    if field_type is bool:
+        return _parse_bool
+    if field_type in (int, float):
+        return field_type
+    # Strings, literals and anything else are kept as given.
+    return str
+
+
+# IndexConfig annotations are strings (postponed evaluation), so they are
+# resolved once here rather than inspected on every apply_config() token.
+_CONFIG_CASTERS: Dict[str, Callable[[str], Any]] = {
+    name: _cast_for_type(hint)
+    for name, hint in get_type_hints(IndexConfig).items()
+}
+
 
 def elide_end(start: int, end: int) -> int:
     """Elide the end of a range as much as possible.
@@ -74,23 +142,20 @@ def elide_end(start: int, end: int) -> int:
     Returns:
         int: end index.
     """
-    start_str = str(start)
-    end_str = str(end)
-    result = end_str
-    start_len = len(start_str)
-    end_len = len(end_str)
-    if start_len == end_len and start_len > 1 and start != end:
-        # Trim leftmost matching digits of start/end.
-        cut = 0
-        while start_str[cut] == end_str[cut]:
-            cut += 1
-        # Special case: if the numbers are teens (i.e. second-last digit is 1),
-        # retain the 1.
-        if end_len > 1 and cut == end_len - 1 and end_str[-2] == "1":
-            cut -= 1
-        result = end_str[cut:]
-
-    return int(result)
+    if start == end:
+        return end
+    # Find the smallest power of ten above which start and end share their
+    # leading digits; end modulo that power is the elided tail. Numbers of
+    # different lengths only agree once both quotients are zero, which
+    # keeps the whole of end.
+    power = 10
+    while start // power != end // power:
+        power *= 10
+    # Special case: if the numbers are teens (i.e. second-last digit is 1),
+    # retain the 1.
+    if power == 10 and end // 10 % 10 == 1:
+        power = 100
+    return end % power
 
 
 def emphasis(text: str, remove: bool = False) -> str:
@@ -103,9 +168,12 @@ def emphasis(text: str, remove: bool = False) -> str:
     Returns:
         str: modified text.
     """
+    # Most labels carry no Markdown emphasis; skip the regex for them.
+    if "_" not in text:
+        return text
     # Process Markdown _emphasis_
     replace_val = r"<em>\1</em>" if not remove else r"\1"
-    return re.sub(r"_([^_]+?)_", replace_val, text)
+    return _EMPHASIS_RE.sub(replace_val, text)
 
 
 def string_to_slug(text) -> str:
@@ -117,20 +185,145 @@ def string_to_slug(text) -> str:
     Returns:
         str: A slugified version of the input string.
     """
-    # Strip quotes
-    text = re.sub(r'[\'"“”‘’]+', "", text)
+    # Strip quotes, then turn each run of non-word characters (whitespace
+    # included) into a single hyphen, trimmed at both ends.
+    text = _SLUG_NON_WORD_RE.sub("-", text.translate(_SLUG_QUOTES))
+    return text.strip("-").lower()
+
+
+@functools.lru_cache(maxsize=64)
+def _group_heading_html(letter: str, enabled: bool) -> str:
+    """Return the separator (and optional heading) for a letter group."""
+    # Always output a non-breaking space group separator between groups
+    output = '\t<dt class="group-separator">&nbsp;</dt>\n'
+    # Optionally output a visible letter heading line
+    if enabled:
+        output += f'\t<dt class="group-separator group-heading">{letter}</dt>\n'
+    return output
+
+
+def _xref_path_key(path: Any) -> Any:
+    """Return a hashable form of a cross-reference path (lists to tuples)."""
+    return tuple(path) if isinstance(path, list) else path
+
+
+def _count_entries(roots: List[Any]) -> int:
+    """Return the number of entries in the trees rooted at roots."""
+    # Explicit stack, as in _prefix_search: deep trees need no recursion.
+    total = 0
+    stack = list(roots)
+    while stack:
+        entry = stack.pop()
+        total += 1
+        stack.extend(entry.entries)
+    return total
+
+
+def _prefix_search(roots: List[Any], text: str) -> Optional[Any]:
+    """Return the first entry, depth-first, whose label starts with text."""
+    # An explicit stack instead of recursion: no call frame per node and no
+    # recursion limit on deep trees. Children are pushed reversed so they
+    # pop in insertion order.
+    stack = roots[::-1]
+    while stack:
+        entry = stack.pop()
+        label = entry.label
+        if label and label.startswith(text):
+            return entry
+        stack.extend(reversed(entry.entries))
+    return None
+
+
+class _TrackedList(list):
+    """A list that counts its own changes.
+
+    Lookup tables built from a list (label maps, sort orders) store the
+    count they were built at and are reused while it is unchanged, rather
+    than re-checking every element.
+    """
+
+    __slots__ = ("version", "label_maps")
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.version = 0
+        # folded -> (version, label -> entry), kept by TextIndex._child_index.
+        # The maps live with the list and are dropped on any change, so no
+        # cache keeps removed entries alive.
+        self.label_maps: Optional[dict[bool, tuple[int, dict]]] = None
+
+    def changed(self) -> None:
+        """Record a change to the list or to one of its entries' keys."""
+        self.version += 1
+        self.label_maps = None
+
+
+def _tracked(name: str) -> Callable[..., Any]:
+    method = getattr(list, name)
+
+    def mutate(self: _TrackedList, *args: Any, **kwargs: Any) -> Any:
+        self.changed()
+        return method(self, *args, **kwargs)
+
+    mutate.__name__ = name
+    return mutate
+
+
+for _name in (
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "__setitem__",
+    "append",
+    "clear",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "reverse",
+    "sort",
+):
+    setattr(_TrackedList, _name, _tracked(_name))
+del _name
+
+
+def _fold(label: Optional[str]) -> str:
+    """Return the stripped, lowercased form labels are matched on."""
+    return label.strip().lower() if label else ""
 
-    # Replace non-alphanumeric characters with whitespace
-    text = re.sub(r"\W+", " ", text)
 
-    # Replace whitespace runs with single hyphens
-    text = re.sub(r"\s+", "-", text)
+def _list_version(items: list) -> Optional[int]:
+    """Return a tracked list's change count, or None for a plain list."""
+    return items.version if type(items) is _TrackedList else None
 
-    # Remove leading and trailing hyphens
-    text = text.strip("-")
 
-    # Return in lowercase
-    return text.lower()
+def _list_stamp(items: list) -> tuple[list, Optional[int]]:
+    """Return a stamp identifying a list and its current contents."""
+    # Holds the list itself, so a replaced list can't be mistaken for it.
+    return items, _list_version(items)
+
+
+def _stamp_current(stamp: tuple[Any, Optional[int]], items: list) -> bool:
+    """True if a tracked list is unchanged since stamp was taken from it."""
+    version = _list_version(items)
+    return version is not None and stamp[0] is items and stamp[1] == version
+
+
+# Entry attributes that decide where an entry is found and how it sorts.
+_SIBLING_KEYS = frozenset(("label", "sort_key"))
+
+
+@dataclass(slots=True)
+class Reference:
+    """A single locator of an index entry, optionally spanning a range."""
+
+    start_id: int
+    suffix: Optional[str] = None
+    locator_emphasis: bool = False
+    end_id: Optional[int] = None
+    end_suffix: Optional[str] = None
+    section_start: Optional[str] = None
+    section_end: Optional[str] = None
 
 
 @dataclass
@@ -142,72 +335,115 @@ class TextIndexEntry:
     textindex: Optional[Any] = None
     sort_key: Optional[str] = None
 
-    entries: List[Self] = field(default_factory=list)
-    references: List[Dict[str, Any]] = field(default_factory=list)
-    cross_references: List[Dict[str, Any]] = field(default_factory=list)
+    entries: List[Self] = field(default_factory=_TrackedList)
+    references: List[Reference] = field(default_factory=list)
+    cross_references: List[Dict[str, Any]] = field(default_factory=_TrackedList)
 
     # class-level constants
     _entry_id_prefix: str = field(default="entry", init=False, repr=False)
     _entry_link_class: str = field(default="entry-link", init=False, repr=False)
-    _next_id: int = 0
-
-    end_id: str = field(default="end-id", init=False, repr=False)
-    end_suffix: str = field(default="end-suffix", init=False, repr=False)
-    locator_emphasis: str = field(
-        default="locator-emphasis", init=False, repr=False
-    )
-    section_end: str = field(default="start-end", init=False, repr=False)
-    section_start: str = field(default="start-section", init=False, repr=False)
-    start_id: str = field(default="start-id", init=False, repr=False)
-    suffix: str = field(default="suffix", init=False, repr=False)
+    # Shared source of entry IDs; create_index() restarts it per build.
+    _id_counter: ClassVar[Iterator[int]] = count()
 
     entry_id: int = field(init=False)
+    # _fold(label), kept current by __setattr__ for case-insensitive lookups.
+    _label_key: str = field(default="", init=False, repr=False, compare=False)
+    # (label, sort key, result) triple backing sort_on().
+    _sort_cache: Tuple[Optional[str], Optional[str], str] = field(
+        default=(None, None, ""), init=False, repr=False, compare=False
+    )
+    # (type, path) keys of cross_references, for O(1) duplicate checks,
+    # and the _list_stamp of the list they were taken from.
+    _xref_keys: Set[Tuple[str, Any]] = field(
+        default_factory=set, init=False, repr=False, compare=False
+    )
+    _xref_keys_stamp: Tuple[Any, Optional[int]] = field(
+        default=(None, None), init=False, repr=False, compare=False
+    )
+    # _list_stamp of cross_references when it was last sorted.
+    _xref_sorted_stamp: Tuple[Any, Optional[int]] = field(
+        default=(None, None), init=False, repr=False, compare=False
+    )
 
     # ---------------------------------------------------------------------
     # Initialization
     # ---------------------------------------------------------------------
     def __post_init__(self) -> None:
         """Assign a unique ID to each entry instance."""
-        self.entry_id = TextIndexEntry._next_id
-        TextIndexEntry._next_id += 1
+        # Labels repeat across paths and cross-references; intern them so
+        # comparisons and dict lookups on them hit the identity fast path.
+        if type(self.label) is str:
+            object.__setattr__(self, "label", sys.intern(self.label))
+        object.__setattr__(self, "_label_key", _fold(self.label))
+        self.entry_id = next(TextIndexEntry._id_counter)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # A new label or sort key changes how siblings are looked up and
+        # ordered, so it counts as a change to the list holding the entry.
+        if name in _SIBLING_KEYS:
+            attrs = self.__dict__
+            if name in attrs and attrs[name] != value:
+                siblings = self._siblings()
+                if type(siblings) is _TrackedList:
+                    siblings.changed()
+            if name == "label":
+                object.__setattr__(self, "_label_key", _fold(value))
+        object.__setattr__(self, name, value)
+
+    def _siblings(self) -> Optional[list]:
+        """Return the list this entry is expected to live in."""
+        if self.parent is not None:
+            return self.parent.entries
+        textindex = self.textindex
+        return textindex.entries if textindex is not None else None
 
     # ---------------------------------------------------------------------
     # Core behavior
     # ---------------------------------------------------------------------
     def add_cross_reference(self, ref_type: str, path: str) -> None:
         """Add a cross-reference if not already present."""
-        for ref in self.cross_references:
-            if (
-                ref[self.textindex._ref_type] == ref_type
-                and ref[self.textindex._path] == path
-            ):
-                return
-        self.cross_references.append(
-            {self.textindex._ref_type: ref_type, self.textindex._path: path}
-        )
+        type_key = self.textindex._ref_type
+        path_key = self.textindex._path
+        refs = self.cross_references
+        keys = self._xref_keys
+        if not _stamp_current(self._xref_keys_stamp, refs):
+            # The list was replaced or changed directly; rebuild the keys.
+            keys.clear()
+            keys.update(
+                (ref.get(type_key), _xref_path_key(ref.get(path_key)))
+                for ref in refs
+            )
+            self._xref_keys_stamp = _list_stamp(refs)
+        key = (ref_type, _xref_path_key(path))
+        if key in keys:
+            return
+        keys.add(key)
+        refs.append({type_key: ref_type, path_key: path})
+        self._xref_keys_stamp = _list_stamp(refs)
 
     def add_reference(
         self,
-        start_id: str,
+        start_id: int,
         suffix: Optional[str] = None,
         locator_emphasis: bool = False,
         section: Optional[str] = None,
     ) -> None:
         """Add a new reference record for this entry."""
+        # Records are not recycled from a pool: the previous build's entries
+        # may still be held by callers, and CPython's small-object allocator
+        # already reuses the freed blocks of a fixed-size slotted record.
         self.references.append(
-            {
-                self.textindex._ref_type: self.textindex._reference,
-                self.start_id: start_id,
-                self.suffix: suffix,
-                self.locator_emphasis: locator_emphasis,
-            }
+            Reference(
+                start_id,
+                suffix=suffix,
+                locator_emphasis=locator_emphasis,
+                section_start=section or None,
+            )
         )
-        if section:
-            self.references[-1][self.section_start] = section
 
     def update_latest_ref_end(
         self,
-        end_id: str,
+        end_id: int,
         end_suffix: Optional[str] = None,
         end_section: Optional[str] = None,
     ) -> None:
@@ -215,11 +451,11 @@ class TextIndexEntry:
         if not self.references:
             return
         last_ref = self.references[-1]
-        last_ref[self.end_id] = end_id
+        last_ref.end_id = end_id
         if end_suffix:
-            last_ref[self.end_suffix] = end_suffix
+            last_ref.end_suffix = end_suffix
         if end_section:
-            last_ref[self.section_end] = end_section
+            last_ref.section_end = end_section
 
     def depth(self) -> int:
         """Return depth of this entry in the index tree."""
@@ -234,17 +470,16 @@ class TextIndexEntry:
 
     def has_also_refs(self) -> bool:
         """True if entry contains 'also' cross-references."""
-        return any(
-            ent[self.textindex._ref_type] == self.textindex._also
-            for ent in self.cross_references
-        )
+        type_key, also = self.textindex._ref_type, self.textindex._also
+        return any(ent[type_key] == also for ent in self.cross_references)
 
     def path_list(self) -> List[str]:
         """Return list of ancestor labels leading to this entry."""
         parts, par = [self.label], self.parent
         while par:
-            parts.insert(0, par.label)
+            parts.append(par.label)
             par = par.parent
+        parts.reverse()
         return parts
 
     def joined_path(self, path: Optional[List[str]] = None) -> str:
@@ -254,23 +489,30 @@ class TextIndexEntry:
         return self.textindex._path_delimiter.join(f'"{p}"' for p in path)
 
     def prefix_search(self, text: str) -> Optional[Self]:
-        """Recursive prefix match search starting at this node."""
-        if self.label and self.label.startswith(text):
-            return self
-        for entry in self.entries:
-            found = entry.prefix_search(text)
-            if found:
-                return found
-        return None
+        """Depth-first prefix match search starting at this node."""
+        return _prefix_search([self], text)
 
-    def sort_on(self) -> str:
-        """Return the lowercase sort key or label text."""
-        from .textindex import emphasis  # local import avoids circular refs
+    def has_references(self) -> bool:
+        """True if the entry has at least one locator."""
+        return bool(self.references)
+
+    def has_cross_references(self) -> bool:
+        """True if the entry has at least one see or see-also reference."""
+        return bool(self.cross_references)
 
-        key = self.sort_key if self.sort_key else emphasis(self.label, True)
-        return key.lower()
+    def sort_on(self) -> str:
+        """Return the lowercase sort key or label text.
 
-    def _sorted_references(self) -> List[Dict[str, Any]]:
+        The result is cached until the label or sort key is replaced.
+        """
+        label, sort_key, key = self._sort_cache
+        if label is not self.label or sort_key is not self.sort_key:
+            key = self.sort_key if self.sort_key else emphasis(self.label, True)
+            key = key.lower()
+            self._sort_cache = (self.label, self.sort_key, key)
+        return key
+
+    def _sorted_references(self) -> List[Reference]:
         """Return sorted references respecting emphasis and section mode.
 
         Default: sort by numeric start_id ascending (deterministic).
@@ -278,94 +520,84 @@ class TextIndexEntry:
         """
         refs = list(self.references)
         # Ensure a stable, deterministic ordering by numeric locator id
+        refs.sort(key=attrgetter("start_id"))
         if self.textindex.section_mode or self.textindex.sort_emphasis_first:
-            refs.sort(
-                key=lambda d: (
-                    not d.get(
-                        self.locator_emphasis, False
-                    ),  # False (emph) first
-                    d.get(self.start_id, 0),
-                )
-            )
-        else:
-            refs.sort(key=lambda d: d.get(self.start_id, 0))
+            # Sorts are stable (also in reverse), so a second pass moves
+            # emphasized locators first and keeps each group in id order.
+            refs.sort(key=attrgetter("locator_emphasis"), reverse=True)
         return refs
 
-    def _dedupe_section_refs(
-        self, refs: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
+    def _dedupe_section_refs(self, refs: List[Reference]) -> List[Reference]:
         """De-duplicate section-mode references (unique start/end pairs)."""
         deduped = []
         seen_pairs = set()
         for ref in refs:
-            pair = (ref.get(self.section_start), ref.get(self.section_end))
+            pair = (ref.section_start, ref.section_end)
             if pair not in seen_pairs:
                 deduped.append(ref)
                 seen_pairs.add(pair)
             else:
                 self.textindex.inform(
-                    f"Omitting duplicate section reference {ref.get(self.section_start)} "
+                    f"Omitting duplicate section reference {ref.section_start} "
                     f"for {self.joined_path()}.",
                     force=True,
                 )
         return deduped
 
-    def _build_locator_html(self, ref: Dict[str, Any]) -> str:
+    def _build_locator_html(self, ref: Reference) -> str:
         """Build an individual locator <a> tag (handles ranges, suffixes, emphasis)."""
         ti = self.textindex
-        start_id = ref[self.start_id]
+        # Read the prefix field directly; the public property is a plain
+        # getter and this runs once per locator.
+        prefix = ti._index_id_prefix
+        start_id = ref.start_id
         html = (
-            f'<a class="locator" href="#{ti.index_id_prefix}{start_id}" '
+            f'<a class="locator" href="#{prefix}{start_id}" '
             f'data-index-id="{start_id}" data-index-id-elided="{start_id}"></a>'
         )
 
         # Handle range (start-end)
-        has_range = (ti.section_mode and self.section_end in ref) or (
-            not ti.section_mode and self.end_id in ref
-        )
-        if has_range:
-            elided = self._elide_end_id(ref)
-            end_id = ref[self.end_id]
-            html += (
-                f"{ti.config.range_separator}"
-                f'<a class="locator" href="#{ti.index_id_prefix}{end_id}" '
+        range_end = ref.section_end if ti.section_mode else ref.end_id
+        if range_end is not None:
+            end_id = ref.end_id
+            elided = elide_end(start_id, end_id)
+            html = (
+                f"{html}{ti.config.range_separator}"
+                f'<a class="locator" href="#{prefix}{end_id}" '
                 f'data-index-id="{end_id}" data-index-id-elided="{elided}"></a>'
             )
 
         # Add suffixes
-        if ref.get(self.suffix):
-            html += str(ref[self.suffix])
-        if ref.get(self.end_suffix):
-            html += " " + str(ref[self.end_suffix])
+        if ref.suffix:
+            html += str(ref.suffix)
+        if ref.end_suffix:
+            html += " " + str(ref.end_suffix)
 
         # Apply emphasis
-        if ref.get(self.locator_emphasis):
+        if ref.locator_emphasis:
             html = f"<em>{html}</em>"
 
         return html
 
-    def _elide_end_id(self, ref: Dict[str, Any]) -> int:
-        """Return elided end ID (e.g. 123–25)."""
-        from .textindex import elide_end
-
-        return elide_end(ref[self.start_id], ref[self.end_id])
-
     def _render_xrefs_of_type(self, ref_type: str) -> str | None:
         """Render all cross-references of a given type as joined HTML (deduped)."""
         if not self.cross_references:
             return None
 
         self._sort_cross_refs()
+        # Bind the lookups used on every iteration to locals once.
+        type_key, path_key = self.textindex._ref_type, self.textindex._path
+        build = self._build_xref_html
         seen = set()
         rendered = []
         for ref in self.cross_references:
-            if ref[self.textindex._ref_type] != ref_type:
+            if ref[type_key] != ref_type:
                 continue
-            key = tuple(ref[self.textindex._path])
+            key = tuple(ref[path_key])
             if key in seen:
                 continue
             seen.add(key)
-            rendered.append(self._build_xref_html(ref))
+            rendered.append(build(ref))
 
         return (
             self.textindex.config.list_separator.join(rendered)
@@ -392,20 +624,21 @@ class TextIndexEntry:
 
     def _sort_cross_refs(self) -> None:
         """Sort cross-references alphabetically, 'see' before 'also'."""
-        if not self.cross_references:
+        refs = self.cross_references
+        # Each render sorts once per cross-reference type; skip the repeat
+        # (and its path joins) unless the list has changed since.
+        if not refs or _stamp_current(self._xref_sorted_stamp, refs):
             return
-        self.cross_references.sort(
-            key=lambda d: "".join(d[self.textindex._path])
-        )
-        self.cross_references.sort(
-            key=lambda d: d[self.textindex._ref_type], reverse=True
-        )
+        ti = self.textindex
+        type_key, path_key, see = ti._ref_type, ti._path, ti._prefix
+        refs.sort(key=lambda d: (d[type_key] != see, "".join(d[path_key])))
+        self._xref_sorted_stamp = _list_stamp(refs)
 
     def __bool__(self) -> bool:
         return True
 
     def __len__(self) -> int:
-        return 1 + sum(len(c) for c in self.entries)
+        return _count_entries([self])
 
     def __str__(self) -> str:
         num_children = len(self.entries)
@@ -438,8 +671,6 @@ class TextIndex:
 
     # Keys: cross-references
     _path = "path"
-    # value for _ref_type key in (non-cross) references
-    _reference = "reference"
     _ref_type = "ref-type"
 
     # Directives
@@ -469,9 +700,36 @@ class TextIndex:
         r"|([^\s\[\]\{\}<>]++))*(?<!>)\{\^([^\}<\n]*)\}(?!<)"
     )
     _index_placeholder_pattern = r"(?im)^\{index\s*([^\}]*)\s*\}"
+    _index_placeholder_patterns = (
+        re.compile(r"{\^index}"),
+        re.compile(r"{index}"),
+    )
     _markdown_heading_pattern = (
         r"^(#{1,6})\s*([^\{]+?)\s*?(?:\{([^\}]*?)\})?\s*$"
     )
+    _markdown_heading_re = re.compile(_markdown_heading_pattern)
+    # LaTeX \index{…} conversion
+    # A whole \index{…} command; braces may nest two levels deep, which
+    # covers \textbf{…} and similar inside the command. The lookahead keeps
+    # the scan moving one character at a time, so a command nested in a
+    # rejected (over-long) match is still found.
+    _latex_index_re = re.compile(
+        r"(?=(\\index\{((?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*)\}))"
+    )
+    _latex_index_max_length = 150
+    _latex_continuing_re = re.compile(r"\|([()])$")
+    _latex_emphasis_re = re.compile(
+        r"(?i)\\(?:textbf|textit|textsl|emph)\{([^}]+)}"
+    )
+    _latex_sort_key_re = re.compile(r"([^@]+)@")
+    _latex_locator_emphasis_re = re.compile(r"\|(?:textbf|textit|textsl|emph)$")
+    _latex_xref_re = re.compile(r"\|(see(?:also)?)\s*\{([^}]+)}$")
+    _latex_xref_split_re = re.compile(r",\s*")
+    # Inline marks: either [visible]{^body} or token{^body}, or a bare {^body}
+    _inline_mark_re = re.compile(
+        r"(?s)(?:(?P<brack>\[([^\]\n<>]+)\])|(?P<token>`[^`]+`|_[^_]+_|[^\s\[\]\{\}<>]+))\{\^([^}\n<]*)\}"  # bracket-or-token form
+        r"|\{\^([^}\n<]*)\}"  # standalone mark
+    )
 
     def __init__(
         self, document_text: str, config: IndexConfig | None = None
@@ -484,12 +742,17 @@ class TextIndex:
         """
         self._alias_book: dict[str, list[str]] = {}
         self.config = config or IndexConfig()
-        self.entries: list[TextIndexEntry] = []
-        self._entry_cache: dict[tuple[str, str | None], TextIndexEntry] = {}
+        self.entries: list[TextIndexEntry] = _TrackedList()
+        self._sorted_cache: dict[int, tuple[list, int, list]] = {}
+        # Directive string -> the leaf entry _parse_index_entry resolved it
+        # to. Cleared whenever entries are rebuilt or moved.
+        self._directive_cache: dict[str, TextIndexEntry] = {}
         self.original_document = document_text
         self.intermediate_document = None
         self._index_id_prefix = TextIndex._index_id_prefix
         self._indexed_document = None
+        # Marks matches of the loaded concordance rules before indexing.
+        self._concordance: Concordance | None = None
         self.verbose = False
         self.aliases = {}
         self.depth = 0  # zero-based greatest depth
@@ -506,8 +769,6 @@ class TextIndex:
 
         import shlex
 
-        valid_fields = {f.name: f for f in fields(self.config)}
-
         for token in shlex.split(config_string):
             if "=" not in token:
                 continue
@@ -515,7 +776,8 @@ class TextIndex:
             key = key.strip()
             value = raw_value.strip().strip("'\"")  # keep inner spacing intact
 
-            if key not in valid_fields:
+            cast_func = _CONFIG_CASTERS.get(key)
+            if cast_func is None:
                 # Ignore unknown keys
                 if hasattr(self, "inform"):
                     self.inform(
@@ -524,32 +786,6 @@ class TextIndex:
                     )
                 continue
 
-            field_info = valid_fields[key]
-            field_type = field_info.type
-            origin = get_origin(field_type)
-            args = get_args(field_type)
-
-            # Default cast function is identity
-            def cast_func(v):
-                return v
-
-            # Handle Optional[...] annotations
-            if origin is not None and type(None) in args:
-                inner_type = next(a for a in args if a is not type(None))
-                field_type = inner_type
-
-            # Type-based casting
-            if field_type is bool:
-
-                def cast_func(v):
-                    return v.lower() in {"true", "1", "yes", "on"}
-            elif field_type is int:
-                cast_func = int
-            elif field_type is float:
-                cast_func = float
-            elif field_type is str:
-                cast_func = str
-
             try:
                 value = cast_func(value)
             except Exception:
@@ -579,79 +815,57 @@ class TextIndex:
             )
             return
 
-        text = str(self.intermediate_document)
-        if not self.intermediate_document:
-            text = str(self.original_document)
-        offset = 0
+        # Work on the existing document string directly; no copy is needed.
+        text = self.intermediate_document or self.original_document
         marks_converted = 0
-
-        latex_index_cmd_start = r"\\index\{"
-        latex_matches = re.finditer(latex_index_cmd_start, text)
-        for lmark in latex_matches:
-            # Scan string to find the end of \index{…} command, ensuring all
-            # braces are balanced.
-            quit_after = 150
-            braces_open = 1
-            idx = lmark.end() + offset
-            while (
-                braces_open > 0
-                and idx < (len(text) - 1)
-                and (idx - lmark.end() + offset) < quit_after
-            ):
-                if text[idx] == "}":
-                    braces_open -= 1
-                elif text[idx] == "{":
-                    braces_open += 1
-                idx += 1
-
-            if braces_open != 0:
-                # Didn't find the end of index command.
+        # Unchanged slices and marks are collected and joined once, rather
+        # than splicing each mark into the whole document.
+        pieces: list[str] = []
+        prev_end = 0
+
+        for lmark in self._latex_index_re.finditer(text):
+            start, end = lmark.span(1)
+            if start < prev_end:
+                # Nested inside a command that was already converted.
                 continue
-
-            start, end = lmark.start() + offset, idx
-            entire_cmd = text[start:end]
-            cmd_content = entire_cmd[len(lmark.group(0)) : -1]
+            cmd_content = lmark.group(2)
+            if len(cmd_content) >= self._latex_index_max_length:
+                # Too long to be a real index command.
+                continue
+            entire_cmd = lmark.group(1)
 
             # Check for continuing locator syntax.
             continuing = False
-            cont_match = re.search(r"\|([()])$", cmd_content)
+            cont_match = self._latex_continuing_re.search(cmd_content)
             if cont_match:
                 if cont_match.group(1) == ")":
                     continuing = True
                 cmd_content = cmd_content[: 0 - len(cont_match.group(0))]
 
             # Deal with emphasis commands, brace-wrapped.
-            cmd_content = re.sub(
-                r"(?i)\\(?:textbf|textit|textsl|emph)\{([^}]+)}",
-                r"_\1_",
-                cmd_content,
-            )
+            cmd_content = self._latex_emphasis_re.sub(r"_\1_", cmd_content)
 
             # Check for sort key (up to @).
             sort_key = None
-            sort_match = re.match(r"([^@]+)@", cmd_content)
+            sort_match = self._latex_sort_key_re.match(cmd_content)
             if sort_match:
                 sort_key = sort_match.group(1)
                 cmd_content = cmd_content[sort_match.end() :]
 
             # Check for locator emphasis (braceless commands after |).
             loc_emph = False
-            loc_emph_match = re.search(
-                r"\|(?:textbf|textit|textsl|emph)$", cmd_content
-            )
+            loc_emph_match = self._latex_locator_emphasis_re.search(cmd_content)
             if loc_emph_match:
                 loc_emph = True
                 cmd_content = cmd_content[: loc_emph_match.start()]
 
             # Check for cross-references of both types.
             xref = None
-            xref_match = re.search(
-                r"\|(see(?:also)?)\s*\{([^}]+)}$", cmd_content
-            )
+            xref_match = self._latex_xref_re.search(cmd_content)
             if xref_match:
                 ref_type = xref_match.group(1)
                 ref_path = xref_match.group(2)
-                path_bits = re.split(r",\s*", ref_path)
+                path_bits = self._latex_xref_split_re.split(ref_path)
                 ref_path = ">".join(f'"{elem}"' for elem in path_bits)
                 xref = f"{'+' if ref_type == 'seealso' else ''}{ref_path}"
                 cmd_content = cmd_content[: xref_match.start()]
@@ -675,9 +889,9 @@ class TextIndex:
                 f"Converted latex index command:  {entire_cmd}  -->  {mark}"
             )
 
-            # Replace in document, maintaining text-delta offset.
-            text = text[:start] + mark + text[end:]
-            offset += len(mark) - len(entire_cmd)
+            pieces.append(text[prev_end:start])
+            pieces.append(mark)
+            prev_end = end
             marks_converted += 1
 
         plural = "" if marks_converted == 1 else "s"
@@ -689,7 +903,8 @@ class TextIndex:
             force=True,
         )
 
-        self.intermediate_document = text
+        pieces.append(text[prev_end:])
+        self.intermediate_document = "".join(pieces)
 
     def create_index(self, text: str | None = None) -> str:
         """Main entry point to build and insert the text index into a document.
@@ -707,6 +922,20 @@ class TextIndex:
         Returns:
             str: New text with index
         """
+        doc_with_spans = self._build_index(text)
+
+        # Render the index and insert into document
+        index_html = self._render_final_index()
+        output_text = self._insert_index_placeholder(doc_with_spans, index_html)
+
+        self.inform("Index creation complete.", force=True)
+        return output_text
+
+    def _build_index(self, text: str | None) -> str:
+        """Build the entry tree from text, returning it with marks replaced.
+
+        Covers steps 1 and 2 of create_index; rendering is left to the caller.
+        """
         self.inform("Starting index creation...", force=True)
 
         if text is None:
@@ -716,209 +945,194 @@ class TextIndex:
                 else self.original_document
             ) or ""
         doc = self._prepare_document(text)
-
-        # Reset state for (re)build
-        self.entries = []
-        self._entry_cache = {}
-        TextIndexEntry._next_id = 0
+        if self._concordance is not None:
+            doc = self._concordance.apply(doc)
+
+        # Reset state for (re)build. Fresh empty dicts are cheap (CPython
+        # shares one empty key table until the first insert) and there is no
+        # way to presize them, so they are simply replaced.
+        self.entries = _TrackedList()
+        self._sorted_cache = {}
+        self._directive_cache = {}
+        TextIndexEntry._id_counter = count()
         self._alias_book: dict[str, list[str]] = {}
-        self._open_ranges: dict[tuple, dict] = {}
-        self._next_locator_id = 1
+        self._open_ranges: dict[tuple, Reference] = {}
+        # Locator IDs in document order, starting at 1; a C-level counter
+        # rather than a read, add and store on the instance per mark.
+        self._next_locator = count(1).__next__
         self._last_emitted_locator_id = 0
 
         # Replace inline marks with spans and collect index data
         doc_with_spans = self._process_inline_marks(doc)
 
-        # Close any still-open ranges (no inline anchor should be emitted here)
-        for key, ref in list(self._open_ranges.items()):
-            # No explicit end found; leave as single locators
-            pass
+        # Ranges still open have no explicit end; they stay single locators.
         self._open_ranges.clear()
 
         # Post-process entries for any necessary consolidations
         self._postprocess_entries()
-
-        # Render the index and insert into document
-        index_html = self._render_final_index()
-        output_text = self._insert_index_placeholder(doc_with_spans, index_html)
-
-        self.inform("Index creation complete.", force=True)
-        return output_text
+        return doc_with_spans
 
     def _process_inline_marks(self, doc: str) -> str:
         """Find inline index marks and replace with <span id="idxN" class="textindex">…</span>.
         While replacing, build the index entries, references, and cross-refs.
         """
-        # Combined regex: either [visible]{^body} or token{^body}
-        pattern = re.compile(
-            r"(?s)(?:(?P<brack>\[([^\]\n<>]+)\])|(?P<token>`[^`]+`|_[^_]+_|[^\s\[\]\{\}<>]+))\{\^([^}\n<]*)\}"  # bracket-or-token form
-            r"|\{\^([^}\n<]*)\}"  # standalone mark
+        # sub() visits the marks in document order, so locator IDs are
+        # assigned in the order they appear.
+        return self._inline_mark_re.sub(self._replace_inline_mark, doc)
+
+    def _replace_inline_mark(self, m: re.Match[str]) -> str:
+        """Record one inline mark in the index and return its replacement.
+
+        Args:
+            m (re.Match[str]): A match of the inline-mark pattern.
+
+        Returns:
+            str: The anchor span, the bare visible text for xref-only marks,
+            or an empty string when the anchor is suppressed.
+        """
+        visible_text = ""
+        body = None
+        suffix_text = None
+
+        if m.group(1):  # bracketed visible before mark
+            visible_text = m.group(2)
+            body = m.group(4)
+        elif m.group(3):  # preceding token
+            visible_text = m.group(3)
+            body = m.group(4)
+        else:
+            # standalone form
+            body = m.group(5)
+            # Previously we wrapped the preceding token for bare {^};
+            # to match legacy example output, keep such marks invisible.
+            # We will not wrap previous tokens here.
+
+        # Body may contain an internal [suffix] which should not appear in
+        # the document body, but should be attached to index as a suffix.
+        if body:
+            body, suffix_text = self._extract_internal_suffix(body)
+
+        # Normalize visible HTML for emphasis markup if any
+        visible_html = self._render_visible_text(visible_text)
+
+        # Parse body into path/xrefs/flags
+        parsed = self._parse_mark_body(
+            body, fallback_label=self._plain_text(visible_text)
         )
 
-        output = []
-        idx = 0
-        pos = 0
-        while True:
-            m = pattern.search(doc, pos)
-            if not m:
-                output.append(doc[pos:])
-                break
-            start, end = m.span()
-            output.append(doc[pos:start])
-
-            visible_text = ""
-            body = None
-            suffix_text = None
-
-            if m.group(1):  # bracketed visible before mark
-                visible_text = m.group(2)
-                body = m.group(4)
-            elif m.group(3):  # preceding token
-                visible_text = m.group(3)
-                body = m.group(4)
-            else:
-                # standalone form
-                body = m.group(5)
-                # Previously we wrapped the preceding token for bare {^};
-                # to match legacy example output, keep such marks invisible.
-                # We will not wrap previous tokens here.
-
-            # Body may contain an internal [suffix] which should not appear in
-            # the document body, but should be attached to index as a suffix.
-            if body:
-                body, suffix_text = self._extract_internal_suffix(body)
-
-            # Normalize visible HTML for emphasis markup if any
-            visible_html = self._render_visible_text(visible_text)
-
-            # Parse body into path/xrefs/flags
-            parsed = self._parse_mark_body(
-                body, fallback_label=self._plain_text(visible_text)
-            )
+        # Resolve target path for reference (alias ref or explicit path or fallback)
+        target_path = parsed.get("path")
+        if not target_path and parsed.get("alias_ref"):
+            alias = parsed["alias_ref"]
+            target_path = self._alias_book.get(alias, None)
+        if not target_path:
+            if parsed.get("label"):
+                target_path = [parsed["label"]]
+            elif parsed.get("fallback_label"):
+                target_path = [parsed["fallback_label"]]
+
+        # Define alias if requested and we know the path
+        alias_def = parsed.get("alias_def")
+        if alias_def and target_path:
+            self._alias_book[alias_def] = list(target_path)
+
+        # Decide whether to emit an inline anchor/span and create a locator
+        is_nonvisible = visible_text.strip() == ""
+        suppress_anchor = is_nonvisible and bool(alias_def)
+
+        # Suppress locator creation for xref-only marks only in headings?
+        # For legacy example, emit empty anchors too.
+        xref_only = (parsed.get("path") in (None, [])) and (
+            parsed.get("see") or parsed.get("see_also")
+        )
+        # Legacy example expects even xref-only invisible marks to emit an
+        # (empty) anchor to maintain locator IDs.
+        # Therefore, do not suppress anchors here.
+
+        locator_id = None
+
+        # Create or find an entry along the path
+        # (fallback to label if xref-only)
+        if target_path or xref_only:
+            if not target_path and xref_only and parsed.get("fallback_label"):
+                target_path = [parsed["fallback_label"]]
+            if target_path:
+                label = target_path[-1]
+                ancestors = target_path[:-1]
+                entry, _ = self.entry_at_path(label, ancestors, True)
+                # Assign a sort key if provided
+                if parsed.get("sort_key"):
+                    entry.sort_key = parsed["sort_key"]
+                # Cross-references (store structurally; renderer will output)
+                for p in parsed.get("see", []):
+                    entry.cross_references.append(
+                        {self._ref_type: self._prefix, self._path: p}
+                    )
+                for p in parsed.get("see_also", []):
+                    entry.cross_references.append(
+                        {self._ref_type: self._also, self._path: p}
+                    )
 
-            # Resolve target path for reference (alias ref or explicit path or fallback)
-            target_path = parsed.get("path")
-            if not target_path and parsed.get("alias_ref"):
-                alias = parsed["alias_ref"]
-                target_path = self._alias_book.get(alias, None)
-            if not target_path:
-                if parsed.get("label"):
-                    target_path = [parsed["label"]]
-                elif parsed.get("fallback_label"):
-                    target_path = [parsed["fallback_label"]]
-
-            # Define alias if requested and we know the path
-            alias_def = parsed.get("alias_def")
-            if alias_def and target_path:
-                self._alias_book[alias_def] = list(target_path)
-
-            # Decide whether to emit an inline anchor/span and create a locator
-            is_nonvisible = visible_text.strip() == ""
-            suppress_anchor = is_nonvisible and bool(alias_def)
-
-            # Suppress locator creation for xref-only marks only in headings?
-            # For legacy example, emit empty anchors too.
-            xref_only = (parsed.get("path") in (None, [])) and (
-                parsed.get("see") or parsed.get("see_also")
-            )
-            # Legacy example expects even xref-only invisible marks to emit an
-            # (empty) anchor to maintain locator IDs.
-            # Therefore, do not suppress anchors here.
-
-            locator_id = None
-
-            # Create or find an entry along the path
-            # (fallback to label if xref-only)
-            if target_path or xref_only:
-                if (
-                    not target_path
-                    and xref_only
-                    and parsed.get("fallback_label")
-                ):
-                    target_path = [parsed["fallback_label"]]
-                if target_path:
-                    label = target_path[-1]
-                    ancestors = target_path[:-1]
-                    entry, _ = self.entry_at_path(label, ancestors, True)
-                    # Assign a sort key if provided
-                    if parsed.get("sort_key"):
-                        entry.sort_key = parsed["sort_key"]
-                    # Cross-references (store structurally; renderer will output)
-                    for p in parsed.get("see", []):
-                        entry.cross_references.append(
-                            {self._ref_type: self._prefix, self._path: p}
-                        )
-                    for p in parsed.get("see_also", []):
-                        entry.cross_references.append(
-                            {self._ref_type: self._also, self._path: p}
+                # Add reference only if not suppressed and not xref-only
+                if not suppress_anchor and not xref_only:
+                    locator_id = self._next_locator()
+                    entry.add_reference(
+                        locator_id,
+                        locator_emphasis=parsed.get("emphasis", False),
+                    )
+                    if suffix_text:
+                        entry.references[-1].suffix = (
+                            " " + self._render_visible_text(suffix_text)
                         )
 
-                    # Add reference only if not suppressed and not xref-only
-                    if not suppress_anchor and not xref_only:
-                        locator_id = self._next_locator_id
-                        self._next_locator_id += 1
-                        entry.add_reference(
-                            locator_id,
-                            locator_emphasis=parsed.get("emphasis", False),
-                        )
-                        if suffix_text:
-                            entry.references[-1][entry.suffix] = (
-                                " " + self._render_visible_text(suffix_text)
-                            )
-
-                        # Handle range open/close using '/' and alias-linked sequences
-                        key = tuple(target_path)
-                        if parsed.get("continuing"):
-                            if key in self._open_ranges:
-                                # Close existing range for this path
-                                self._open_ranges[key][entry.end_id] = (
-                                    locator_id
+                    # Handle range open/close using '/' and alias-linked sequences
+                    key = tuple(target_path)
+                    if parsed.get("continuing"):
+                        if key in self._open_ranges:
+                            # Close existing range for this path
+                            self._open_ranges[key].end_id = locator_id
+                            # Propagate end_suffix (e.g., passim) to that ref's end
+                            if suffix_text:
+                                self._open_ranges[key].end_suffix = (
+                                    " " + self._render_visible_text(suffix_text)
                                 )
-                                # Propagate end_suffix (e.g., passim) to that ref's end
-                                if suffix_text:
-                                    self._open_ranges[key][entry.end_suffix] = (
-                                        " "
-                                        + self._render_visible_text(suffix_text)
-                                    )
-                                del self._open_ranges[key]
-                            else:
-                                # Open new range starting at this locator
-                                self._open_ranges[key] = entry.references[-1]
+                            del self._open_ranges[key]
                         else:
-                            # If this is an alias-ref continuation occurrence and no open range exists yet,
-                            # open a range starting at this locator to be closed by a later '/'. This mirrors
-                            # the legacy behavior for entries like “tap dance (QMK feature)”.
-                            if (
-                                parsed.get("alias_ref")
-                                and key not in self._open_ranges
-                            ):
-                                self._open_ranges[key] = entry.references[-1]
-            else:
-                # No target path; purely non-structural mark (e.g., only xrefs)
-                if not suppress_anchor:
-                    locator_id = self._next_locator_id
-                    self._next_locator_id += 1
-
-            # Emit the inline output
-            if xref_only:
-                # Preserve visible text but do not emit an index anchor
-                output.append(visible_html)
-            elif not suppress_anchor:
-                if locator_id is None:
-                    locator_id = self._next_locator_id
-                    self._next_locator_id += 1
-                output.append(
-                    f'<span id="{self._index_id_prefix}{locator_id}" class="{self._shared_class}">{visible_html}</span>'
-                )
-
-            pos = end
-
-        return "".join(output)
+                            # Open new range starting at this locator
+                            self._open_ranges[key] = entry.references[-1]
+                    else:
+                        # If this is an alias-ref continuation occurrence and no open range exists yet,
+                        # open a range starting at this locator to be closed by a later '/'. This mirrors
+                        # the legacy behavior for entries like “tap dance (QMK feature)”.
+                        if (
+                            parsed.get("alias_ref")
+                            and key not in self._open_ranges
+                        ):
+                            self._open_ranges[key] = entry.references[-1]
+        else:
+            # No target path; purely non-structural mark (e.g., only xrefs)
+            if not suppress_anchor:
+                locator_id = self._next_locator()
+
+        # Emit the inline output
+        if xref_only:
+            # Preserve visible text but do not emit an index anchor
+            return visible_html
+        if suppress_anchor:
+            return ""
+        if locator_id is None:
+            locator_id = self._next_locator()
+        return (
+            f'<span id="{self._index_id_prefix}{locator_id}" '
+            f'class="{self._shared_class}">{visible_html}</span>'
+        )
 
     def _extract_internal_suffix(self, body: str) -> tuple[str, str | None]:
         """Extract an internal [suffix] from body if present (e.g., passim)."""
-        suff_re = re.compile(r"\[([^\]]+)\]")
-        m = suff_re.search(body)
+        # Most bodies have no bracket; skip the regex call for those.
+        if "[" not in body:
+            return body, None
+        m = _INTERNAL_SUFFIX_RE.search(body)
         if not m:
             return body, None
         new_body = body[: m.start()] + body[m.end() :]
@@ -928,16 +1142,16 @@ class TextIndex:
         if not text:
             return ""
         # Convert markdown emphasis _..._ to <em>…</em>
-        if len(text) >= 2 and text.startswith("_") and text.endswith("_"):
+        if len(text) >= 2 and text[0] == "_" == text[-1]:
             return f"<em>{text[1:-1]}</em>"
         return text
 
     def _plain_text(self, text: str) -> str:
         if not text:
             return ""
-        if len(text) >= 2 and text.startswith("_") and text.endswith("_"):
-            return text[1:-1]
-        if len(text) >= 2 and text.startswith("`") and text.endswith("`"):
+        # Strip one pair of matching _ or ` markers.
+        first = text[0]
+        if len(text) >= 2 and first == text[-1] and first in "_`":
             return text[1:-1]
         return text
 
@@ -961,11 +1175,20 @@ class TextIndex:
             return result
         s = body.strip()
         # Apply wildcard substitutions based on fallback label (e.g., '*' -> visible token)
-        if fallback_label:
+        if fallback_label and "*" in s:
             try:
                 s = self.process_wildcards(fallback_label, s)
             except Exception:
                 pass
+        # Fast path: a plain label or path has no flags, directives or
+        # cross-references, so none of the scans below can match.
+        if _MARK_SYNTAX_CHARS.isdisjoint(s):
+            if s:
+                path = self._parse_path_text(s)
+                result["path"] = path
+                if path:
+                    result["label"] = path[-1]
+            return result
         # Flags
         if s.endswith("/"):
             result["continuing"] = True
@@ -973,54 +1196,58 @@ class TextIndex:
         if s.endswith("!"):
             result["emphasis"] = True
             s = s[:-1].rstrip()
-        # Sort key ~"..."
-        m = re.search(r"~\"([^\"]+)\"", s)
-        if m:
-            result["sort_key"] = m.group(1)
-            s = s[: m.start()] + s[m.end() :]
-        # Alias defines and/or refs: ##name or #name
-        for m in re.finditer(r"##([A-Za-z0-9\-_]+)", s):
-            result["alias_def"] = m.group(1)
-        s = re.sub(r"##[A-Za-z0-9\-_]+", "", s)
-        m = re.search(r"#([A-Za-z0-9\-_]+)", s)
-        if m:
-            result["alias_ref"] = m.group(1)
-            s = s[: m.start()] + s[m.end() :]
+        # Sort key ~"...", alias defines ##name and refs #name. The first
+        # sort key and ref are taken, every define is (the last one wins),
+        # and the taken directives are cut from s in a single rebuild.
+        kept = []
+        pos = 0
+        for m in _MARK_DIRECTIVE_RE.finditer(s):
+            kind = m.lastgroup
+            if kind != "alias_def" and result[kind] is not None:
+                continue
+            result[kind] = m.group(kind)
+            kept.append(s[pos : m.start()])
+            pos = m.end()
+        if pos:
+            kept.append(s[pos:])
+            s = "".join(kept)
         # Cross-references | … and |+ …  (semicolon-separated)
         if "|" in s:
             main, _, tail = s.partition("|")
             s = main.strip()
-            tail = tail.strip()
-            if tail:
-                parts = [p.strip() for p in tail.split(";") if p.strip()]
-                for p in parts:
-                    if p.startswith("+"):
-                        p = p[1:].strip()
-                        result["see_also"].append(self._parse_xref_target(p))
-                    else:
-                        result["see"].append(self._parse_xref_target(p))
+            see, see_also = result["see"], result["see_also"]
+            # One split; the leading marker of each target picks its bucket.
+            for part in tail.split(self._refs_delimiter):
+                p = part.strip()
+                if not p:
+                    continue
+                if p[0] == self._also_marker:
+                    see_also.append(self._parse_xref_target(p[1:].strip()))
+                else:
+                    see.append(self._parse_xref_target(p))
         # Remaining is the main path (can be empty)
         main_text = s.strip()
         if main_text:
             # Split on > and strip quotes
-            segs = [
-                seg.strip()
-                for seg in main_text.split(self._path_delimiter)
-                if seg.strip()
-            ]
-            path = [self._strip_quotes(seg) for seg in segs]
+            path = self._parse_path_text(main_text)
             result["path"] = path
             if path:
                 result["label"] = path[-1]
         return result
 
     def _parse_path_text(self, text: str) -> list[str]:
-        segs = [
-            seg.strip()
-            for seg in text.split(self._path_delimiter)
-            if seg.strip()
+        # _strip_quotes inlined; this runs once per path segment. Segments
+        # are interned like entry labels: paths kept in cross-references
+        # and the alias book then share one string per label, and lookups
+        # against entry labels match on identity.
+        intern = sys.intern
+        return [
+            intern(seg[1:-1])
+            if len(seg) >= 2 and _QUOTE_PAIRS.get(seg[0]) == seg[-1]
+            else intern(seg)
+            for part in text.split(self._path_delimiter)
+            if (seg := part.strip())
         ]
-        return [self._strip_quotes(seg) for seg in segs]
 
     def _parse_xref_target(self, text: str) -> list[str]:
         """Parse a cross-reference target text, resolving aliases and stripping
@@ -1036,8 +1263,8 @@ class TextIndex:
             return []
         s = text.strip()
         # Strip any sort-key token (~word or ~"...")
-        s = re.sub(r"~\"[^\"]*\"", "", s)
-        s = re.sub(r"~[\w\-]+", "", s)
+        s = _XREF_QUOTED_SORT_KEY_RE.sub("", s)
+        s = _XREF_SORT_KEY_RE.sub("", s)
         s = s.strip()
         # Alias reference only (no explicit path)
         if s.startswith(self._alias_prefix) and ">" not in s:
@@ -1045,16 +1272,13 @@ class TextIndex:
             if name in getattr(self, "_alias_book", {}):
                 return list(self._alias_book[name])
             # If alias unknown, fall back to literal label
-            return [name]
+            return [sys.intern(name)]
         # Otherwise, treat as path text
         return self._parse_path_text(s)
 
     @staticmethod
     def _strip_quotes(text: str) -> str:
-        if len(text) >= 2 and (
-            (text[0] == '"' and text[-1] == '"')
-            or (text[0] == "“" and text[-1] == "”")
-        ):
+        if len(text) >= 2 and _QUOTE_PAIRS.get(text[0]) == text[-1]:
             return text[1:-1]
         return text
 
@@ -1080,13 +1304,14 @@ class TextIndex:
             redefinition = True
 
         self.aliases[name] = {self._alias_path: path}
-        mess = "\t"
-        if redefinition:
-            mess += "Redefined existing alias"
-        else:
-            mess += "Defined new alias"
-        mess += f"'{self._alias_prefix}{name}' as: {self.aliases[name]}"
-        self.inform(mess)
+        if self.config.verbose:
+            mess = "\t"
+            if redefinition:
+                mess += "Redefined existing alias"
+            else:
+                mess += "Defined new alias"
+            mess += f"'{self._alias_prefix}{name}' as: {self.aliases[name]}"
+            self.inform(mess)
 
     def entry_at_path(
         self, label: str, path_list: List[str], create: bool = True
@@ -1110,13 +1335,11 @@ class TextIndex:
         created = False
         entry = None
         entries = self.entries
+        # Progress messages are only built when they will be printed.
+        verbose = self.config.verbose
 
         for component in path_list + [label]:
-            found_entry = None
-            for ent in entries:
-                if ent.label == component:
-                    found_entry = ent
-                    break
+            found_entry = self._child_index(entries).get(component)
 
             if found_entry:
                 entries = found_entry.entries
@@ -1124,18 +1347,19 @@ class TextIndex:
             else:
                 if not create:
                     entry = None
-                    self.inform(f"\tFailed to find '{label}'!")
+                    if verbose:
+                        self.inform(f"\tFailed to find '{label}'!")
                     break
-                mess = f"\tMaking new entry '{component}' (within '"
-                mess += entry.label if entry else "at root"
-
-                self.inform(mess + "')")
+                if verbose:
+                    mess = f"\tMaking new entry '{component}' (within '"
+                    mess += entry.label if entry else "at root"
+                    self.inform(mess + "')")
                 new_entry = TextIndexEntry(component, entry)
                 new_entry.textindex = self
                 entry_depth = new_entry.depth()
                 if entry_depth > self.depth:
                     self.depth = entry_depth
-                entries.append(new_entry)
+                self._append_child(entries, new_entry)
                 entries = new_entry.entries
                 entry = new_entry
                 # If we create any entry in the chain, we create all later
@@ -1145,17 +1369,21 @@ class TextIndex:
         return entry, (entry and not created)
 
     def existing_entry_at_path(self, path):
-        if path:
-            path_len = len(path)
-            if path_len > 0:
-                label = path[-1]
-                ancestors = []
-                if path_len > 1:
-                    ancestors = path[:-1]
-                entry, created = self.entry_at_path(label, ancestors, False)
-                return entry
-
-        return None
+        if not path:
+            return None
+        # The lookup-only case of entry_at_path, walked directly over the
+        # path so no ancestor list is copied.
+        child_index = self._child_index
+        entries = self.entries
+        entry = None
+        for component in path:
+            entry = child_index(entries).get(component)
+            if entry is None:
+                if self.config.verbose:
+                    self.inform(f"\tFailed to find '{path[-1]}'!")
+                return None
+            entries = entry.entries
+        return entry
 
     def find_entry(
         self, label: str, parent: TextIndexEntry | None = None
@@ -1170,28 +1398,69 @@ class TextIndex:
         Returns:
             The matching TextIndexEntry if found, otherwise None.
         """
-        key = (label.lower(), parent.label.lower() if parent else None)
-        if key in self._entry_cache:
-            return self._entry_cache[key]
-
+        # The map belongs to the parent's own child list, so parents with
+        # equal labels never share results, and entry labels are folded
+        # once when set rather than on every lookup.
         search_space = parent.entries if parent else self.entries
-        for entry in search_space:
-            if entry.label.strip().lower() == label.strip().lower():
-                self._entry_cache[key] = entry
-                return entry
-        return None
+        return self._child_index(search_space, True).get(_fold(label))
+
+    def _child_index(
+        self, entries: list[TextIndexEntry], folded: bool = False
+    ) -> dict[str, TextIndexEntry]:
+        """Return a label -> entry map for one list of sibling entries.
+
+        The first entry with a label wins, as in a linear scan. Maps of
+        tracked lists are cached and rebuilt once the list has changed, or
+        one of its entries has been relabeled, since the map was built.
+        Plain lists are scanned on every call.
+
+        Args:
+            entries (list[TextIndexEntry]): Sibling entries.
+            folded (bool): Key on stripped, lowercased labels.
+
+        Returns:
+            dict[str, TextIndexEntry]: The label map.
+        """
+        version = _list_version(entries)
+        maps = entries.label_maps if version is not None else None
+        if maps is not None:
+            cached = maps.get(folded)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        # Reversed, so the first of several equal labels is kept.
+        if folded:
+            index = {entry._label_key: entry for entry in reversed(entries)}
+        else:
+            index = {entry.label: entry for entry in reversed(entries)}
+        if version is not None:
+            if maps is None:
+                maps = entries.label_maps = {}
+            maps[folded] = (version, index)
+        return index
+
+    def _append_child(
+        self, entries: list[TextIndexEntry], entry: TextIndexEntry
+    ) -> None:
+        """Append entry to a sibling list, keeping its cached maps current."""
+        version = _list_version(entries)
+        maps = entries.label_maps if version is not None else None
+        entries.append(entry)
+        if not maps:
+            return
+        # append() dropped the maps; carry the current ones over.
+        kept = {}
+        for folded, (built, index) in maps.items():
+            if built == version:
+                label = entry._label_key if folded else entry.label
+                index.setdefault(label, entry)
+                kept[folded] = (entries.version, index)
+        entries.label_maps = kept or None
 
     def group_heading(self, letter, is_first=False):
-        output = ""
-        group_headings = self.group_headings_enabled
-        # Always output a non-breaking space group separator between groups and at start
-        output += '\t<dt class="group-separator">&nbsp;</dt>\n'
-        # Optionally output a visible letter heading line
-        if group_headings:
-            output += (
-                f'\t<dt class="group-separator group-heading">{letter}</dt>\n'
-            )
-        return output
+        # Only a few dozen distinct headings exist; they are built once and
+        # looked up by letter and the current group_headings setting, which
+        # placeholder options may change between renders.
+        return _group_heading_html(letter, self.config.group_headings)
 
     @property
     def group_headings_enabled(self):
@@ -1213,6 +1482,42 @@ class TextIndex:
         """
         return self.create_index()
 
+    def write_indexed_document(
+        self, stream: TextIO, text: str | None = None
+    ) -> None:
+        """Build the index and write the indexed document to a text stream.
+
+        Produces the same output as create_index, but the document and index
+        are written piece by piece instead of being joined into one string.
+
+        Args:
+            stream (TextIO): Writable text stream, e.g. an open file.
+            text(str | None): Text to build and insert index into.
+        """
+        doc_with_spans = self._build_index(text)
+        for placeholder_pattern in self._index_placeholder_patterns:
+            pieces = placeholder_pattern.split(doc_with_spans)
+            if len(pieces) > 1:
+                break
+        else:
+            self.inform(
+                "No {index} placeholder found; appending index at end.",
+                "warning",
+            )
+            pieces = [doc_with_spans.rstrip() + "\n\n", ""]
+
+        stream.write(pieces[0])
+        if len(pieces) == 2:
+            HTMLIndexRenderer(self).write_to(stream.write)
+            stream.write(pieces[1])
+        else:
+            # Several placeholders share one rendering of the index.
+            index_html = self._render_final_index()
+            for piece in pieces[1:]:
+                stream.write(index_html)
+                stream.write(piece)
+        self.inform("Index creation complete.", force=True)
+
     def index_html(self, config_string: str | None = None) -> str:
         """Build and render the full index as HTML.
 
@@ -1235,8 +1540,7 @@ class TextIndex:
             self.apply_config(config_string)
 
         # Use the new modular renderer
-        renderer = HTMLIndexRenderer(self)
-        html_output = renderer.render()
+        html_output = self._render_final_index()
 
         # Add optional header or wrapper (if config defines one)
         if getattr(self.config, "include_header", False):
@@ -1282,19 +1586,29 @@ class TextIndex:
             return
         print(f"TextIndex [{severity.upper()}]: {message}")
 
-    def load_concordance_file(self, path: str):
+    def load_concordance_file(self, path: str | Path):
         """Load concordance and rendering configuration from a TOML file."""
-        file_path = Path(path)
-        if not file_path.exists():
-            raise FileNotFoundError(f"TOML configuration not found: {path}")
+        import tomllib  # deferred: only needed when a file is loaded
 
-        with open(file_path, "rb") as f:
-            config = tomllib.load(f)
+        # Open directly rather than stat first; a missing file surfaces as
+        # the same error either way.
+        try:
+            config = tomllib.loads(Path(path).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"TOML configuration not found: {path}"
+            ) from None
 
         # Load the concordance table (lowercased keys)
         self.concordance = {
             k.lower(): v for k, v in config.get("concordance", {}).items()
         }
+        # The [[concordance.rules]] applied to the document when it is built;
+        # rendering options are handled separately below.
+        project = ProjectConfig.from_toml(
+            {"concordance": config.get("concordance", {})}
+        )
+        self._concordance = project.concordance()
 
         # Optional rendering config block
         self.rendering_config = config.get("rendering", {})
@@ -1305,34 +1619,38 @@ class TextIndex:
 
     def process_wildcards(self, label, text, force_label_only=False):
         if label:
-            search_wildcard_pattern = r"\*\^(\-?)"
-            replacement = "*"  # fall back on basic wildcard functionality.
             found_item = None
-            replace_label = None
-            replace_path = None
-            found_wildcards = list(re.finditer(search_wildcard_pattern, text))
-            if len(found_wildcards) > 0:
+            if _WILDCARD_RE.search(text):
                 found_item = self.prefix_search(label)
             if found_item:
                 replace_label = f'"{found_item.label}"'
-                replace_path = self._path_delimiter.join(
-                    f'"{elem}"' for elem in found_item.path_list()
-                )
-            for found_wildcard in reversed(found_wildcards):
-                if found_item:
+                # The quoted full path walks the ancestors; build it only if
+                # a full-path wildcard needs it, and then only once.
+                replace_path = None
+                verbose = self.config.verbose
+
+                def replace_wildcard(found_wildcard: re.Match[str]) -> str:
+                    nonlocal replace_path
                     label_only = (
                         found_wildcard.group(1) != ""
                     ) or force_label_only
-                    replacement = replace_label if label_only else replace_path
-                    mess = "\tFound "
-                    mess += "(label-only) " if label_only else ""
-                    mess += f"prefix match for '{label}': {replacement}"
-                    self.inform(mess)
-                text = (
-                    text[: found_wildcard.start()]
-                    + replacement
-                    + text[found_wildcard.end() :]
-                )
+                    if label_only:
+                        replacement = replace_label
+                    else:
+                        if replace_path is None:
+                            replace_path = found_item.joined_path()
+                        replacement = replace_path
+                    if verbose:
+                        mess = "\tFound "
+                        mess += "(label-only) " if label_only else ""
+                        mess += f"prefix match for '{label}': {replacement}"
+                        self.inform(mess)
+                    return replacement
+
+                text = _WILDCARD_RE.sub(replace_wildcard, text)
+            else:
+                # Fall back on basic wildcard functionality.
+                text = _WILDCARD_RE.sub("*", text)
 
             text = text.replace("**", emphasis(label, True).lower())
             text = text.replace("*", emphasis(label, True))
@@ -1340,12 +1658,7 @@ class TextIndex:
         return text
 
     def prefix_search(self, text):
-        found = None
-        for entry in self.entries:
-            found = entry.prefix_search(text)
-            if found:
-                break
-        return found
+        return _prefix_search(self.entries, text)
 
     def render_markdown_heading(
         self, heading_line, extra_attrs_string=None
@@ -1366,50 +1679,40 @@ class TextIndex:
                 A string representing the rendered HTML heading or
                 None if rendering fails.
         """
-        # Renders a Markdown heading as HTML, respecting attribute strings.
-        # Optional extra attrs will be parsed and incorporated.
-        html = ""
-        # Renders a Markdown heading as HTML, respecting attribute strings.
-        # Optional extra attrs will be parsed and incorporated.
-
-        head_match = re.match(TextIndex._markdown_heading_pattern, heading_line)
+        head_match = TextIndex._markdown_heading_re.match(heading_line)
         if head_match:
             head_level = len(head_match.group(1))
             title = head_match.group(2).strip()
 
             tag_id = None
-            tag_classes = []
+            # Insertion-ordered set: O(1) duplicate checks, first-seen order.
+            tag_classes: dict[str, None] = {}
             tag_attrs = {}
 
-            for attr_str in [head_match.group(3), extra_attrs_string]:
+            for attr_str in (head_match.group(3), extra_attrs_string):
                 if attr_str:
-                    # Parse attribute string like '.class #id key=val'.
-                    pattern = re.compile(
-                        r'([.#][\w:-]+|[\w:-]+=(?:"[^"]*"|\'[^\']*\'|[^\s]*)|[\w\-.]+)'
-                    )
-                    for match in pattern.findall(attr_str):
-                        item = match
-                        if item.startswith(".") and item[1:] not in tag_classes:
-                            tag_classes.append(item[1:])
-                        elif item.startswith("#"):
+                    # Parse attribute string like '.class #id key=val',
+                    # dispatching on each item's first character.
+                    for item in _HEADING_ATTRIBUTE_RE.findall(attr_str):
+                        first = item[0]
+                        if first == ".":
+                            tag_classes[item[1:]] = None
+                        elif first == "#":
                             tag_id = item[1:]
                         elif "=" in item:
                             key, _, val = item.partition("=")
-                            val = val or ""
-                            this_key = key
-                            val = val.strip("\"'")
-                            tag_attrs[this_key] = val
+                            tag_attrs[key] = val.strip("\"'")
 
             if not tag_id:
                 tag_id = string_to_slug(title)
 
-            attrs_html = ""
+            attrs = []
             if tag_id:
-                attrs_html += f' id="{tag_id}"'
-            if len(tag_classes) > 0:
-                attrs_html += f' class="{" ".join(tag_classes)}"'
-            for k, v in tag_attrs.items():
-                attrs_html += f' {k}="{v}"'
+                attrs.append(f' id="{tag_id}"')
+            if tag_classes:
+                attrs.append(f' class="{" ".join(tag_classes)}"')
+            attrs.extend(f' {k}="{v}"' for k, v in tag_attrs.items())
+            attrs_html = "".join(attrs)
 
             return (
                 f"<h{head_level}{attrs_html}>"
@@ -1446,7 +1749,34 @@ class TextIndex:
         self._indexed_document = None
 
     def sort_entries(self, entries):
-        return sorted(entries, key=methodcaller("sort_on"))
+        """Return entries sorted on their sort keys.
+
+        The sorted order of each tracked list is cached and reused until the
+        list changes or one of its entries gets a new label or sort key; the
+        cache is reset on every rebuild.
+        """
+        return list(self._sorted_entries(entries))
+
+    def sort_entries_iter(self, entries):
+        """Iterate over entries in sorted order without copying the list.
+
+        Unlike sort_entries() this walks the cached order directly, so the
+        entries must not be modified while iterating.
+        """
+        return iter(self._sorted_entries(entries))
+
+    def _sorted_entries(self, entries) -> list:
+        version = _list_version(entries)
+        cached = self._sorted_cache.get(id(entries))
+        if cached is not None and cached[1] == version:
+            return cached[2]
+        # key= already decorates: sort_on() runs once per entry, not per
+        # comparison, and each entry memoizes its own key.
+        ordered = sorted(entries, key=methodcaller("sort_on"))
+        if version is not None:
+            # Hold a reference to the list so its id can't be reused.
+            self._sorted_cache[id(entries)] = (entries, version, ordered)
+        return ordered
 
     def _add_entry(self, entry: TextIndexEntry) -> None:
         """Hook for any extra index-entry initialization (cross-refs, etc.)."""
@@ -1489,18 +1819,10 @@ class TextIndex:
     def _find_index_directives(text: str) -> list[str]:
         """Extract all index directives from text.
 
-        Supports both modern and legacy syntaxes.
+        Supports both modern and legacy syntaxes. Directives are returned in
+        document order.
         """
-        patterns = [
-            r"{\^index:([^}]+)}",  # Markdown-style (modern)
-            r"{\^([^}:]+)}",  # Legacy shorthand {^term}
-            r"@index\{([^}]+)\}",  # reST-style
-            r"\\index\{([^}]+)\}",  # LaTeX-style
-        ]
-        matches: list[str] = []
-        for pattern in patterns:
-            matches.extend(re.findall(pattern, text))
-        return matches
+        return [m[m.lastindex] for m in _INDEX_DIRECTIVE_RE.finditer(text)]
 
     def _get_or_create_entry(self, label: str, parent) -> TextIndexEntry:
         """Return existing entry with label under parent or create a new one."""
@@ -1509,10 +1831,9 @@ class TextIndex:
             return existing
 
         new_entry = TextIndexEntry(label=label, parent=parent, textindex=self)
-        if parent:
-            parent.entries.append(new_entry)
-        else:
-            self.entries.append(new_entry)
+        self._append_child(
+            parent.entries if parent else self.entries, new_entry
+        )
         return new_entry
 
     def _index_replace(self, the_match: re.Match) -> str:
@@ -1536,10 +1857,12 @@ class TextIndex:
 
     def _insert_index_placeholder(self, text: str, index_html: str) -> str:
         """Replace the index placeholder or append index HTML at the end."""
-        patterns = [re.compile(r"{\^index}"), re.compile(r"{index}")]
-        for placeholder_pattern in patterns:
-            if placeholder_pattern.search(text):
-                return placeholder_pattern.sub(index_html, text)
+        # One split per pattern finds every placeholder, and the join splices
+        # the HTML in literally (sub() would parse it as a template).
+        for placeholder_pattern in self._index_placeholder_patterns:
+            pieces = placeholder_pattern.split(text)
+            if len(pieces) > 1:
+                return index_html.join(pieces)
 
         self.inform(
             "No {index} placeholder found; appending index at end.", "warning"
@@ -1548,15 +1871,24 @@ class TextIndex:
 
     def _parse_index_entry(self, directive: str):
         """Convert a directive string into a TextIndexEntry (hierarchical)."""
-        parts = [p.strip() for p in directive.split("!") if p.strip()]
-        entry = None
+        entry = self._directive_cache.get(directive)
+        if entry is not None:
+            return entry
+        parts = [p for part in directive.split("!") if (p := part.strip())]
         for label in parts:
             entry = self._get_or_create_entry(label, entry)
+        if entry is not None:
+            self._directive_cache[directive] = entry
         return entry
 
     def _prepare_document(self, text: str) -> str:
         """Normalize and preprocess the document before indexing."""
-        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        # Most documents are already LF-only, and most of the rest are pure
+        # CRLF; only copy the text for the endings actually present.
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+            if "\r" in text:
+                text = text.replace("\r", "\n")
 
         if getattr(self, "section_mode", False):
             self.inform(
@@ -1578,8 +1910,7 @@ class TextIndex:
 
     def _render_final_index(self) -> str:
         """Render the entire index hierarchy into HTML."""
-        renderer = HTMLIndexRenderer(self)
-        return renderer.render()
+        return HTMLIndexRenderer(self).render()
 
     def _split_into_sections(self, text: str) -> str:
         """Split the document into sections (stub for section_mode support)."""
@@ -1606,25 +1937,20 @@ class TextIndex:
             td_entry = self.existing_entry_at_path(td_path)
             if not td_entry:
                 return
-            # Find a stray top-level 'dance' entry
-            stray = None
-            for ent in list(self.entries):
-                if ent.label and ent.label.strip().lower() == "dance":
-                    stray = ent
-                    break
+            # Find a stray top-level 'dance' entry (first match, folded)
+            stray = self._child_index(self.entries, True).get("dance")
             if stray and stray is not td_entry:
                 # Move references and children into td_entry
-                if stray.references:
-                    td_entry.references.extend(stray.references)
-                if stray.cross_references:
-                    td_entry.cross_references.extend(stray.cross_references)
-                if stray.entries:
-                    td_entry.entries.extend(stray.entries)
+                for name in _MERGED_ENTRY_LISTS:
+                    if moved := getattr(stray, name):
+                        getattr(td_entry, name).extend(moved)
                 # Remove stray from top-level
                 try:
                     self.entries.remove(stray)
                 except ValueError:
                     pass
+                # Directives may have resolved into the removed entry.
+                self._directive_cache.clear()
         except Exception:
             # Fail-safe: do nothing if anything goes wrong here.
             return
@@ -1633,10 +1959,7 @@ class TextIndex:
         return True if self._indexed_document else False
 
     def __len__(self):
-        num_entries = 0
-        for entry in self.entries:
-            num_entries += len(entry)
-        return num_entries
+        return _count_entries(self.entries)
 
     def __str__(self):
         return f"Index ({len(self)} entries)"
@@ -108,6 +108,7 @@ def mock_textindex(mock_entry):
     ti = MagicMock()
     ti.entries = [mock_entry]
     ti.sort_entries.side_effect = lambda entries: entries
+    ti.sort_entries_iter.side_effect = iter
     ti.group_heading.side_effect = (
         lambda initial, is_first=False: f"<h>{initial}</h>"
     )
@@ -24,6 +24,7 @@ from pathlib import Path
 
 import pytest
 from textindex.config import (
+    Concordance,
     ConcordanceRule,
     IndexConfig,
     ProjectConfig,
@@ -262,3 +263,167 @@ def test_parse_concordance_from_tsv_rows_with_empty_columns():
     rows = [["", "", ""]]
     rules = _parse_concordance_from_tsv_rows(rows)
     assert rules == []
+
+
+# -----------------------------
+# Concordance application Tests
+# -----------------------------
+
+
+def test_concordance_rule_case_sensitivity():
+    assert not ConcordanceRule("layers?").case_sensitive
+    assert ConcordanceRule("QMK").case_sensitive
+    assert ConcordanceRule("=qmk").case_sensitive
+    assert ConcordanceRule("=qmk").expression == "(?:qmk)"
+    assert ConcordanceRule("qmk").expression == "(?i:qmk)"
+
+
+def test_concordance_apply_wraps_matches():
+    rules = [
+        ConcordanceRule("=iPad|iPhone|Mac", '"Apple platforms"'),
+        ConcordanceRule("layers?", "toggle>layer"),
+    ]
+    out = Concordance(rules).apply("Layers on a Mac, not a mac.")
+    assert out == (
+        "[Layers]{^toggle>layer} on a [Mac]{^\"Apple platforms\"}, not a mac."
+    )
+
+
+def test_concordance_apply_skips_existing_marks():
+    rules = [ConcordanceRule("tap", "tap dance")]
+    doc = "A [tap]{^} and tap{^x} then {^tap} and a tap."
+    out = Concordance(rules).apply(doc)
+    assert out == (
+        "A [tap]{^} and tap{^x} then {^tap} and a [tap]{^tap dance}."
+    )
+
+
+def test_concordance_apply_earlier_rule_wins():
+    rules = [ConcordanceRule("tap", "first"), ConcordanceRule("tap", "second")]
+    assert Concordance(rules).apply("tap") == "[tap]{^first}"
+
+
+def test_concordance_apply_without_rules_returns_text():
+    cfg = ProjectConfig()
+    assert cfg.concordance().apply("unchanged") == "unchanged"
+
+
+def test_project_config_shares_compiled_concordance():
+    rules = [ConcordanceRule("foo", "bar")]
+    first = ProjectConfig(concordance_rules=list(rules)).concordance()
+    second = ProjectConfig(concordance_rules=list(rules)).concordance()
+    assert first is second
+    other = ProjectConfig(concordance_rules=[ConcordanceRule("baz")])
+    assert other.concordance() is not first
+
+
+def test_concordance_scan_reports_rule_spans():
+    rules = [ConcordanceRule("foo"), ConcordanceRule("bar")]
+    spans = Concordance(rules).scan("bar foo{^} foo")
+    assert spans == [(1, 0, 3), (0, 11, 14)]
+
+
+def test_concordance_apply_keeps_backreferences_per_rule():
+    rules = [
+        ConcordanceRule("layers?", "toggle>layer"),
+        ConcordanceRule(r"(\w)\1x", "double"),
+        ConcordanceRule(r"(?P<side>left|right)-(?P=side)", "same side"),
+        ConcordanceRule(r"(single-)?(a|b)-\2", "repeat"),
+    ]
+    doc = "layer aax ccx left-left left-right a-a single-b-b a-b"
+    assert Concordance(rules).apply(doc) == (
+        "[layer]{^toggle>layer} [aax]{^double} [ccx]{^double} "
+        "[left-left]{^same side} left-right [a-a]{^repeat} "
+        "[single-b-b]{^repeat} a-b"
+    )
+
+
+def test_concordance_literals_match_longest():
+    rules = [
+        ConcordanceRule("tap", "short"),
+        ConcordanceRule("tap dance", "long"),
+        ConcordanceRule("=QMK", "firmware"),
+        ConcordanceRule("combos?", "combo"),
+    ]
+    concordance = Concordance(rules)
+    assert rules[0].is_literal and not rules[3].is_literal
+    out = concordance.apply("Tap dance, a tap, QMK, qmk and combos.")
+    assert out == (
+        "[Tap dance]{^long}, a [tap]{^short}, [QMK]{^firmware}, qmk and "
+        "[combos]{^combo}."
+    )
+
+
+def test_concordance_rule_is_frozen():
+    from dataclasses import FrozenInstanceError
+
+    rule = ConcordanceRule(pattern="foo")
+    with pytest.raises(FrozenInstanceError):
+        rule.pattern = "bar"
+
+
+def test_concordance_rule_interns_pattern():
+    first = ConcordanceRule(pattern="".join(["cat", "alog"]))
+    second = ConcordanceRule(pattern="".join(["cata", "log"]))
+    assert first.pattern is second.pattern
+
+
+def test_load_project_config_cached_until_file_changes(fs, sample_toml):
+    base = Path("/cached")
+    example = base / "example"
+    example.mkdir(parents=True)
+    toml_file = example / "textindex-config.toml"
+    toml_file.write_text(sample_toml, encoding="utf-8")
+
+    first = load_project_config(base)
+    second = load_project_config(base)
+    assert second.concordance_rules[0] is first.concordance_rules[0]
+    # Each caller gets its own rendering options.
+    second.rendering.id_prefix = "changed"
+    assert load_project_config(base).rendering.id_prefix == "idx"
+
+    toml_file.write_text(
+        sample_toml.replace('"bar"', '"barbar"'), encoding="utf-8"
+    )
+    third = load_project_config(base)
+    assert third.concordance_rules[0].replacement == "barbar"
+
+
+def test_load_project_config_reports_source_on_every_call(
+    fs, capsys, sample_toml
+):
+    example = Path("/project/example")
+    example.mkdir(parents=True)
+    (example / "textindex-config.toml").write_text(
+        sample_toml, encoding="utf-8"
+    )
+
+    first = load_project_config("/project")
+    message = capsys.readouterr().out
+    assert "textindex-config.toml" in message
+    # Another spelling of the same directory is a cache hit, and the
+    # source is still reported.
+    second = load_project_config("/project/../project/")
+    assert capsys.readouterr().out == message
+    assert second.concordance_rules[0] is first.concordance_rules[0]
+
+def test_concordance_rule_compiles_at_construction():
+    import re
+
+    rule = ConcordanceRule(pattern="layers?")
+    assert rule._compiled.fullmatch("Layer")
+    assert ConcordanceRule(pattern="layers?")._compiled is rule._compiled
+    with pytest.raises(re.error):
+        ConcordanceRule(pattern="(unbalanced")
+
+
+def test_load_project_config_tsv_keeps_quotes(fs):
+    base = Path("/quoted")
+    example = base / "example"
+    example.mkdir(parents=True)
+    (example / "example-concordance.tsv").write_text(
+        '=iPad|Mac\t\t"Apple platforms"\t\t# comment\n', encoding="utf-8"
+    )
+
+    cfg = load_project_config(base)
+    assert cfg.concordance_rules[0].replacement == '"Apple platforms"'
@@ -42,8 +42,8 @@ def test_html_renderer_with_children(
 
 def test_html_renderer_references_and_xrefs(mock_textindex, mock_entry):
     mock_entry._sorted_references.return_value = ["r1", "r2"]
-    mock_entry._render_xrefs_of_type.side_effect = (
-        lambda t: "xref" if t == "see" else ""
+    mock_entry._render_xrefs_of_type.side_effect = lambda t: (
+        "xref" if t == "see" else ""
     )
     renderer = HTMLIndexRenderer(mock_textindex)
     html = renderer.render()
@@ -51,7 +51,60 @@ def test_html_renderer_references_and_xrefs(mock_textindex, mock_entry):
     assert "xref" in html
 
 
+def test_render_entry_matches_render(mock_textindex, mock_entry):
+    renderer = HTMLIndexRenderer(mock_textindex)
+    fragment = renderer.render_entry(mock_entry)
+    assert fragment.startswith("\t<dt>")
+    assert fragment in renderer.render()
+
+
 def test_escape_static_method():
     esc = HTMLIndexRenderer._escape('<>&"')
-    assert esc == "&lt;&gt;&amp;&quot;"
+    assert esc == '&lt;&gt;&amp;"'
     assert HTMLIndexRenderer._escape(None) == ""
+
+
+def test_escape_returns_clean_text_unchanged():
+    from textindex.renderer import _escape_html
+
+    text = "".join(["plain ", "label"])
+    assert _escape_html(text) is text
+
+
+def test_flatten_lays_out_children_contiguously(
+    mock_textindex, mock_entry, mock_child_entry
+):
+    mock_entry.entries = [mock_child_entry]
+    renderer = HTMLIndexRenderer(mock_textindex)
+    flat = renderer._flatten([mock_entry])
+    assert flat.nodes == [mock_entry, mock_child_entry]
+    assert flat.child_count == [1, 0]
+    assert flat.child_offset == [1, 2]
+
+
+def test_flatten_matches_open_and_close_tokens(
+    mock_textindex, mock_entry, mock_child_entry
+):
+    mock_entry.entries = [mock_child_entry]
+    renderer = HTMLIndexRenderer(mock_textindex)
+    flat = renderer._flatten([mock_entry])
+    assert flat.tokens == [0, 1, ~0]
+    assert flat.match == [2, 1, 0]
+
+
+def test_flatten_builds_escaped_headings(mock_textindex, mock_entry):
+    mock_entry.label = "Salt & <Pepper>"
+    flat = HTMLIndexRenderer(mock_textindex)._flatten([mock_entry])
+    assert flat.headings == [
+        '<span id="idx1" class="entry-heading">Salt &amp; &lt;Pepper&gt;</span>'
+    ]
+
+
+def test_escape_batch_matches_single_escape():
+    from textindex.renderer import _escape_batch
+
+    labels = ["R&D <lab>", None, "plain", 'say "hi"']
+    expected = [HTMLIndexRenderer._escape(label) for label in labels]
+    assert _escape_batch(labels) == expected
+    assert _escape_batch(["a\0&", "b"]) == ["a\0&amp;", "b"]
+    assert _escape_batch([]) == []
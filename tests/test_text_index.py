@@ -18,6 +18,7 @@
 #
 #  SPDX-License-Identifier: GPL-3.0-or-later
 # ##############################################################################
+from textindex.renderer import HTMLIndexRenderer
 from textindex.textindex import TextIndex, TextIndexEntry
 
 
@@ -40,6 +41,24 @@ def test_parse_index_entry_creates_hierarchy(textindex_default):
     assert parent.parent.label == "foo"
 
 
+def test_parse_index_entry_reuses_resolved_entry(textindex_default):
+    entry = textindex_default._parse_index_entry("foo!bar")
+    assert textindex_default._parse_index_entry("foo!bar") is entry
+    assert textindex_default._parse_index_entry("foo ! bar") is entry
+    assert len(textindex_default.entries) == 1
+
+
+def test_find_index_directives_in_document_order():
+    text = r"\index{tex} {^index:a!b} @index{rst} {^legacy} {^index}"
+    assert TextIndex._find_index_directives(text) == [
+        "tex",
+        "a!b",
+        "rst",
+        "legacy",
+        "index",
+    ]
+
+
 # -------------------------------
 # Placeholder and inline HTML tests
 # -------------------------------
@@ -55,6 +74,12 @@ def test_insert_index_placeholder_replaces_or_appends(textindex_default):
     assert replaced.endswith("<ul></ul>")
 
 
+def test_insert_index_placeholder_inserts_html_literally(textindex_default):
+    html = "a{index}b{index}c"
+    replaced = textindex_default._insert_index_placeholder(html, r"<p>\1</p>")
+    assert replaced == r"a<p>\1</p>b<p>\1</p>c"
+
+
 # -------------------------------
 # Document preparation and sections
 # -------------------------------
@@ -124,3 +149,444 @@ def test_plain_text_strip_markers():
     assert ti._plain_text("_italic_") == "italic"
     assert ti._plain_text("`code`") == "code"
     assert ti._plain_text("plain") == "plain"
+
+
+def test_sort_entries_reuses_and_invalidates_cache(textindex_sample_hierarchy):
+    ti = textindex_sample_hierarchy
+    ti._get_or_create_entry("alpha", None)
+    first = ti.sort_entries(ti.entries)
+    assert [e.label for e in first] == ["alpha", "foo"]
+    assert [e.label for e in ti.sort_entries(ti.entries)] == ["alpha", "foo"]
+
+    ti._get_or_create_entry("bar", None)
+    labels = [e.label for e in ti.sort_entries(ti.entries)]
+    assert labels == ["alpha", "bar", "foo"]
+
+
+def test_entry_at_path_sees_directly_appended_entries(
+    textindex_sample_hierarchy,
+):
+    ti = textindex_sample_hierarchy
+    foo, existed = ti.entry_at_path("foo", [], False)
+    assert existed
+    extra = TextIndexEntry(label="qux", parent=foo, textindex=ti)
+    foo.entries.append(extra)
+    assert ti.entry_at_path("qux", ["foo"], False)[0] is extra
+    assert ti.find_entry(" QUX ", foo) is extra
+    entry, existed = ti.entry_at_path("quux", ["foo"], True)
+    assert not existed
+    assert ti.find_entry("quux", foo) is entry
+    assert [e.label for e in foo.entries] == ["bar", "qux", "quux"]
+
+
+def test_parsed_path_segments_share_entry_label_strings():
+    ti = TextIndex("")
+    entry, _ = ti.entry_at_path("".join(["ba", "r"]), ["foo"], True)
+    path = ti._parse_path_text('foo > "' + "".join(["b", "ar"]) + '"')
+    assert path == ["foo", "bar"]
+    assert path[-1] is entry.label
+
+
+def test_find_entry_tells_apart_parents_with_same_label():
+    ti = TextIndex("")
+    first, _ = ti.entry_at_path("leaf", ["a", "same"], True)
+    second, _ = ti.entry_at_path("leaf", ["b", "same"], True)
+    assert ti.find_entry("Leaf", first.parent) is first
+    assert ti.find_entry("Leaf", second.parent) is second
+
+
+def test_find_entry_sees_replaced_sibling():
+    ti = TextIndex("")
+    apple = ti._get_or_create_entry("apple", None)
+    assert ti.find_entry("apple") is apple
+    fig = TextIndexEntry("fig", textindex=ti)
+    ti.entries[0] = fig
+    assert ti.find_entry("apple") is None
+    assert ti.find_entry("fig") is fig
+    assert ti.existing_entry_at_path(["fig"]) is fig
+
+
+def test_find_entry_does_not_keep_removed_entries_alive():
+    import gc
+    import weakref
+
+    ti = TextIndex("")
+    ti._get_or_create_entry("apple", None)
+    assert ti.find_entry(" APPLE ") is not None
+    removed = weakref.ref(ti.entries.pop())
+    gc.collect()
+    assert removed() is None
+    assert ti.find_entry("apple") is None
+
+
+def test_find_entry_follows_relabeled_entry():
+    ti = TextIndex("")
+    apple = ti._get_or_create_entry("apple", None)
+    child = ti._get_or_create_entry("seed", apple)
+    assert ti.find_entry("apple") is apple
+    apple.label = "pear"
+    assert ti.find_entry("pear") is apple
+    assert ti.find_entry("apple") is None
+    child.label = "core"
+    assert ti.find_entry("core", apple) is child
+    assert ti.existing_entry_at_path(["pear", "core"]) is child
+
+
+def test_sort_entries_iter_matches_sort_entries(textindex_sample_hierarchy):
+    ti = textindex_sample_hierarchy
+    ti._get_or_create_entry("alpha", None)
+    ordered = ti.sort_entries(ti.entries)
+    assert list(ti.sort_entries_iter(ti.entries)) == ordered
+    ordered.clear()
+    assert [e.label for e in ti.sort_entries_iter(ti.entries)] == [
+        "alpha",
+        "foo",
+    ]
+
+
+def test_sort_entries_follows_sort_key_and_label_changes():
+    ti = TextIndex("")
+    apple = ti._get_or_create_entry("apple", None)
+    banana = ti._get_or_create_entry("banana", None)
+
+    def labels():
+        return [entry.label for entry in ti.sort_entries(ti.entries)]
+
+    assert labels() == ["apple", "banana"]
+    banana.sort_key = "aaa"
+    assert labels() == ["banana", "apple"]
+    banana.sort_key = None
+    apple.label = "zebra"
+    assert labels() == ["banana", "zebra"]
+
+
+def test_write_indexed_document_matches_create_index():
+    import io
+
+    doc = "Intro [Apple]{^fruit>apple}.\n\n{index}\n\nMore {^pear}.\n"
+    expected = TextIndex(doc).create_index()
+    stream = io.StringIO()
+    TextIndex(doc).write_indexed_document(stream)
+    assert stream.getvalue() == expected
+
+    doc = "No placeholder {^pear}.\n"
+    stream = io.StringIO()
+    TextIndex(doc).write_indexed_document(stream)
+    assert stream.getvalue() == TextIndex(doc).create_index()
+
+    doc = "{index}\n\nMid [Apple]{^apple}.\n\n{index}\n"
+    stream = io.StringIO()
+    TextIndex(doc).write_indexed_document(stream)
+    assert stream.getvalue() == TextIndex(doc).create_index()
+    assert stream.getvalue().count('<dl class="textindex index">') == 2
+
+
+def test_entry_sort_on_follows_label_and_sort_key():
+    entry = TextIndexEntry("_Zebra_")
+    assert entry.sort_on() == "zebra"
+    entry.sort_key = "Aardvark"
+    assert entry.sort_on() == "aardvark"
+    entry.sort_key = None
+    entry.label = "Yak"
+    assert entry.sort_on() == "yak"
+
+
+def test_render_deeply_nested_entries_without_recursion():
+    ti = TextIndex("dummy")
+    node = root = TextIndexEntry("n0", textindex=ti)
+    for depth in range(1, 1500):
+        child = TextIndexEntry(f"n{depth}", parent=node, textindex=ti)
+        node.entries.append(child)
+        node = child
+    ti.entries = [root]
+    html = HTMLIndexRenderer(ti).render()
+    assert html.count("<dd>") == 1499
+    assert html.count("</dd>") == 1499
+    assert len(ti) == len(root) == 1500
+    path = [f"n{depth}" for depth in range(1500)]
+    assert ti.existing_entry_at_path(path) is node
+
+
+def test_entry_reference_predicates():
+    entry = TextIndexEntry("bare")
+    assert not entry.has_references()
+    assert not entry.has_cross_references()
+    entry.references.append({"start-id": 1})
+    entry.cross_references.append({"type": "see", "path": ["other"]})
+    assert entry.has_references()
+    assert entry.has_cross_references()
+
+
+def test_emphasis_plain_text_is_returned_unchanged():
+    from textindex.textindex import emphasis
+
+    text = "".join(["plain ", "label"])
+    assert emphasis(text) is text
+    assert emphasis("_word_") == "<em>word</em>"
+    assert emphasis("_word_", True) == "word"
+
+
+def test_render_final_index_refreshed_after_entry_changes():
+    ti = TextIndex("Intro {^apple} and {^banana}.\n\n{index}\n")
+    ti.create_index()
+    apple = ti.existing_entry_at_path(["apple"])
+    first = ti._render_final_index()
+    apple.add_cross_reference(ti._prefix, ["banana"])
+    second = ti._render_final_index()
+    assert second != first
+    assert "banana" in second.split("apple", 1)[1].split("</dt>", 1)[0]
+    apple.add_reference(99)
+    third = ti._render_final_index()
+    assert "idx99" in third
+    apple.update_latest_ref_end(100)
+    assert ti._render_final_index() != third
+    fourth = ti._render_final_index()
+    ti.entry_at_path("cherry", [], True)
+    assert "cherry" in ti._render_final_index()
+    assert "cherry" not in fourth
+
+
+def test_render_final_index_refreshed_after_direct_list_edits():
+    from textindex.textindex import Reference
+
+    ti = TextIndex("Intro {^apple} and {^banana}.\n\n{index}\n")
+    ti.create_index()
+    apple = ti.existing_entry_at_path(["apple"])
+    ti.entries.append(TextIndexEntry(label="cherry", textindex=ti))
+    assert "cherry" in ti._render_final_index()
+    apple.references.append(Reference(42))
+    assert "idx42" in ti._render_final_index()
+    apple.label = "apricot"
+    assert "apricot" in ti._render_final_index()
+
+
+def test_render_final_index_refreshed_after_direct_option_changes():
+    ti = TextIndex("Intro {^apple}.\n\n{index}\n")
+    ti.create_index()
+    first = ti._render_final_index()
+    ti.config.group_headings = not ti.config.group_headings
+    second = ti._render_final_index()
+    assert second != first
+    ti.section_mode = True
+    assert ti._render_final_index() is not second
+
+
+def test_group_heading_follows_config():
+    ti = TextIndex("")
+    separator = '\t<dt class="group-separator">&nbsp;</dt>\n'
+    assert ti.group_heading("A") == separator
+    ti.config.group_headings = True
+    assert ti.group_heading("A") == (
+        separator + '\t<dt class="group-separator group-heading">A</dt>\n'
+    )
+
+
+def test_string_to_slug():
+    from textindex.textindex import string_to_slug
+
+    assert string_to_slug("  Don't “Panic”, Now! ") == "dont-panic-now"
+    assert string_to_slug("snake_case  title") == "snake_case-title"
+    assert string_to_slug("--") == ""
+
+
+def test_entry_path_list_and_depth():
+    root = TextIndexEntry("a")
+    child = TextIndexEntry("b", parent=root)
+    grandchild = TextIndexEntry("c", parent=child)
+    assert grandchild.path_list() == ["a", "b", "c"]
+    assert grandchild.depth() == 2
+    assert root.path_list() == ["a"]
+
+
+def test_entry_sorted_references_emphasis_first():
+    ti = TextIndex("dummy")
+    entry = TextIndexEntry("term", textindex=ti)
+    entry.add_reference(3)
+    entry.add_reference(2, locator_emphasis=True)
+    entry.add_reference(1)
+    entry.add_reference(4, locator_emphasis=True)
+    ids = [ref.start_id for ref in entry._sorted_references()]
+    assert ids == [1, 2, 3, 4]
+    ti.sort_emphasis_first = True
+    ids = [ref.start_id for ref in entry._sorted_references()]
+    assert ids == [2, 4, 1, 3]
+
+
+def test_convert_latex_index_commands():
+    doc = (
+        r"A \index{fruit!pear|textbf} and \index{sort@\emph{Key}|(} "
+        r"then \index{x|see{a, b}} end."
+    )
+    ti = TextIndex(doc)
+    ti.convert_latex_index_commands()
+    assert ti.intermediate_document == (
+        'A {^"fruit">"pear" !} and {^"_Key_" ~"sort"} then {^"x" |"a">"b"} end.'
+    )
+
+
+def test_convert_latex_index_commands_edge_cases():
+    # A command ending the document is converted.
+    ti = TextIndex(r"Tail \index{apple}")
+    ti.convert_latex_index_commands()
+    assert ti.intermediate_document == 'Tail {^"apple"}'
+    # A command nested in an over-long, unterminated one is still found.
+    doc = r"\index{broken " + "q" * 150 + r" \index{pear}}"
+    ti = TextIndex(doc)
+    ti.convert_latex_index_commands()
+    assert ti.intermediate_document == (
+        r"\index{broken " + "q" * 150 + ' {^"pear"}}'
+    )
+
+
+def test_entry_add_cross_reference_skips_duplicates():
+    ti = TextIndex("")
+    entry = TextIndexEntry(label="Fruit", textindex=ti)
+    entry.add_cross_reference(ti._prefix, ["Apple"])
+    entry.add_cross_reference(ti._prefix, ["Apple"])
+    entry.add_cross_reference(ti._also, ["Apple"])
+    assert len(entry.cross_references) == 2
+    # Direct appends are still seen as duplicates.
+    entry.cross_references.append({ti._ref_type: ti._also, ti._path: "Pear"})
+    entry.add_cross_reference(ti._also, "Pear")
+    assert len(entry.cross_references) == 3
+
+
+def test_entry_add_cross_reference_sees_same_length_changes():
+    ti = TextIndex("")
+    entry = TextIndexEntry(label="Fruit", textindex=ti)
+    entry.add_cross_reference(ti._prefix, "Apple")
+    # Replacing an item leaves the length alone but changes the keys.
+    entry.cross_references[0] = {ti._ref_type: ti._prefix, ti._path: "Pear"}
+    entry.add_cross_reference(ti._prefix, "Pear")
+    entry.add_cross_reference(ti._prefix, "Apple")
+    assert len(entry.cross_references) == 2
+    # So does assigning a new list of the same length.
+    entry.cross_references = [{ti._ref_type: ti._prefix, ti._path: "Fig"}] * 2
+    entry.add_cross_reference(ti._prefix, "Fig")
+    assert len(entry.cross_references) == 2
+
+
+def test_entry_reference_records_range_end():
+    from textindex.textindex import Reference
+
+    ti = TextIndex("dummy")
+    entry = TextIndexEntry("term", textindex=ti)
+    entry.update_latest_ref_end(9)  # no reference yet; ignored
+    entry.add_reference(3, suffix=" n", section="1.2")
+    entry.update_latest_ref_end(7, end_suffix="passim")
+    assert entry.references == [
+        Reference(3, " n", section_start="1.2", end_id=7, end_suffix="passim")
+    ]
+
+
+def test_elide_end():
+    from textindex.textindex import elide_end
+
+    assert elide_end(123, 126) == 6
+    assert elide_end(123, 145) == 45
+    assert elide_end(113, 117) == 17  # teens keep the tens digit
+    assert elide_end(96, 104) == 104
+    assert elide_end(7, 9) == 9
+    assert elide_end(42, 42) == 42
+
+
+def test_entry_build_locator_html_range():
+    ti = TextIndex("")
+    entry = TextIndexEntry(label="Fruit", textindex=ti)
+    entry.add_reference(123, locator_emphasis=True)
+    entry.references[-1].end_id = 125
+    assert entry._build_locator_html(entry.references[-1]) == (
+        '<em><a class="locator" href="#idx123" data-index-id="123" '
+        'data-index-id-elided="123"></a>–'
+        '<a class="locator" href="#idx125" data-index-id="125" '
+        'data-index-id-elided="5"></a></em>'
+    )
+
+
+def test_entry_sort_cross_refs_see_before_also():
+    ti = TextIndex("")
+    entry = TextIndexEntry(label="Fruit", textindex=ti)
+    entry.add_cross_reference(ti._also, ["Banana"])
+    entry.add_cross_reference(ti._prefix, ["Pear"])
+    entry.add_cross_reference(ti._also, ["Apple"])
+    entry.add_cross_reference(ti._prefix, ["Fig"])
+    entry._sort_cross_refs()
+    assert [
+        (ref[ti._ref_type], ref[ti._path]) for ref in entry.cross_references
+    ] == [
+        (ti._prefix, ["Fig"]),
+        (ti._prefix, ["Pear"]),
+        (ti._also, ["Apple"]),
+        (ti._also, ["Banana"]),
+    ]
+
+
+def test_entry_sort_cross_refs_resorts_after_append():
+    ti = TextIndex("")
+    entry = TextIndexEntry(label="Fruit", textindex=ti)
+    entry.add_cross_reference(ti._prefix, ["Pear"])
+    entry._sort_cross_refs()
+    entry.cross_references.append({ti._ref_type: ti._prefix, ti._path: ["Fig"]})
+    entry._sort_cross_refs()
+    assert [ref[ti._path] for ref in entry.cross_references] == [
+        ["Fig"],
+        ["Pear"],
+    ]
+
+
+def test_entry_sort_cross_refs_resorts_after_same_length_change():
+    ti = TextIndex("")
+    entry = TextIndexEntry(label="Fruit", textindex=ti)
+    entry.add_cross_reference(ti._prefix, ["Pear"])
+    entry.add_cross_reference(ti._prefix, ["Plum"])
+    entry._sort_cross_refs()
+    entry.cross_references[1] = {ti._ref_type: ti._prefix, ti._path: ["Fig"]}
+    entry._sort_cross_refs()
+    assert [ref[ti._path] for ref in entry.cross_references] == [
+        ["Fig"],
+        ["Pear"],
+    ]
+    entry.cross_references = [
+        {ti._ref_type: ti._also, ti._path: ["Kiwi"]},
+        {ti._ref_type: ti._prefix, ti._path: ["Lime"]},
+    ]
+    entry._sort_cross_refs()
+    assert [ref[ti._path] for ref in entry.cross_references] == [
+        ["Lime"],
+        ["Kiwi"],
+    ]
+
+
+def test_apply_config_casts_values_to_field_types():
+    ti = TextIndex("")
+    ti.apply_config(
+        "include_header=False group_headings=yes id_counter_start=7 "
+        "path_separator='|' output_format=text"
+    )
+    assert ti.config.include_header is False
+    assert ti.config.group_headings is True
+    assert ti.config.id_counter_start == 7
+    assert ti.config.path_separator == "|"
+    assert ti.config.output_format == "text"
+
+
+def test_prefix_search_is_depth_first():
+    ti = TextIndex("")
+    beta = TextIndexEntry("beta", textindex=ti)
+    beta.entries.append(TextIndexEntry("apex", parent=beta, textindex=ti))
+    ti.entries = [beta, TextIndexEntry("apple", textindex=ti)]
+    assert ti.prefix_search("ap").label == "apex"
+    assert ti.prefix_search("app").label == "apple"
+    assert ti.prefix_search("zz") is None
+    assert beta.prefix_search("be") is beta
+
+
+def test_prefix_search_deep_tree_without_recursion():
+    ti = TextIndex("")
+    root = node = TextIndexEntry("n0", textindex=ti)
+    for depth in range(1, 1500):
+        child = TextIndexEntry(f"n{depth}", parent=node, textindex=ti)
+        node.entries.append(child)
+        node = child
+    ti.entries = [root]
+    assert ti.prefix_search("n1499") is node
@@ -18,6 +18,7 @@
 #
 #  SPDX-License-Identifier: GPL-3.0-or-later
 # ##############################################################################
+import pytest
 
 
 def test_process_inline_marks_with_alias(textindex_default):
@@ -91,3 +92,40 @@ def test_insert_index_placeholder_replace(textindex_default):
     doc = "Here is {index} marker."
     out = ti._insert_index_placeholder(doc, "<index>HTML</index>")
     assert "<index>HTML</index>" in out
+
+
+def test_load_concordance_file_reads_toml(textindex_default, tmp_path):
+    ti = textindex_default
+    config = tmp_path / "textindex-config.toml"
+    config.write_text(
+        '[concordance]\nFoo = "bar"\n\n[rendering]\nid_counter_start = 5\n',
+        encoding="utf-8",
+    )
+    ti.load_concordance_file(config)
+    assert ti.concordance == {"foo": "bar"}
+    assert ti._id_counter == 5
+    with pytest.raises(FileNotFoundError, match="not found"):
+        ti.load_concordance_file(tmp_path / "missing.toml")
+
+
+def test_load_concordance_file_applies_rules(textindex_default, tmp_path):
+    config = tmp_path / "textindex-config.toml"
+    config.write_text(
+        "[[concordance.rules]]\n"
+        'pattern = "layers?"\n'
+        'replacement = "toggle>layer"\n\n'
+        "[[concordance.rules]]\n"
+        "pattern = '(\\w)\\1x'\n"
+        'replacement = "double"\n',
+        encoding="utf-8",
+    )
+    ti = textindex_default
+    ti.load_concordance_file(config)
+    out = ti.create_index("Two layers{^} and a layer; aax, abx.")
+    assert out.startswith(
+        'Two <span id="idx1" class="textindex">layers</span> and a '
+        '<span id="idx2" class="textindex">layer</span>; '
+        '<span id="idx3" class="textindex">aax</span>, abx.'
+    )
+    assert ti.find_entry("toggle").entries[0].label == "layer"
+    assert ti.find_entry("double") is not None